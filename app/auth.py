@@ -1,7 +1,6 @@
-import firebase_admin
-from firebase_admin import auth as firebase_auth
 from fastapi import HTTPException, Header
 from passlib.context import CryptContext
+from app.services.token_verifier import verify_id_token_cached
 
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -19,7 +18,8 @@ def verify_admin_token(authorization: str = Header(None)):
 
     try:
         token = authorization.split("Bearer ")[1]
-        decoded_token = firebase_auth.verify_id_token(token)
+        # Cached until the token expires; repeat requests skip the signature check.
+        decoded_token = verify_id_token_cached(token)
 
         # Optional: restrict admin access to a specific email
         admin_email = "buzzysentertainment@gmail.com"  # change if needed
@@ -1,9 +1,10 @@
 from datetime import datetime, timedelta
-import stripe
+from app.services import stripe_gateway
 from app.services.firebase_setup import db
 from app.triggers.on_balance_paid import handle_balance_paid
 from app.triggers.on_payment_declined import handle_payment_declined
 from app.root_schema import normalize_payload
+from app.services.invoice_state import get_fresh_invoice_state, remember_invoice_state
 
 # -----------------------------
 # DATE NORMALIZATION
@@ -124,18 +125,32 @@ def charge_booking(b):
     try:
         invoice_id = b.get("stripe_remaining_invoice_id")
         if invoice_id:
-            invoice = stripe.Invoice.retrieve(invoice_id)
-            if invoice.status == "paid":
+            status = get_fresh_invoice_state(invoice_id, b)
+            if status is None:
+                status = stripe_gateway.call("Invoice.retrieve", invoice_id).status
+                remember_invoice_state(invoice_id, status)
+            if status == "paid":
                 return "invoice"
-            stripe.Invoice.pay(
-                invoice_id,
-                payment_method=b["stripe_payment_method_id"],
-                idempotency_key=f"booking-{b['booking_id']}-autopay-invoice",
-            )
+            try:
+                invoice = stripe_gateway.call(
+                    "Invoice.pay",
+                    invoice_id,
+                    payment_method=b["stripe_payment_method_id"],
+                    idempotency_key=f"booking-{b['booking_id']}-autopay-invoice",
+                )
+                remember_invoice_state(invoice_id, invoice.status)
+            except Exception:
+                # A cached state may have missed a payment made elsewhere;
+                # confirm with Stripe before reporting a decline.
+                if stripe_gateway.call("Invoice.retrieve", invoice_id).status == "paid":
+                    remember_invoice_state(invoice_id, "paid")
+                    return "invoice"
+                raise
             return "invoice"
         else:
             # Historical fallback for bookings created before Stripe invoices.
-            stripe.PaymentIntent.create(
+            stripe_gateway.call(
+                "PaymentIntent.create",
                 amount=int(round(float(b["remaining"]) * 100)),
                 currency="usd",
                 customer=b["stripe_customer_id"],
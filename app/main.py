@@ -1,9 +1,10 @@
+import asyncio
 from app.routers import tasks
 from fastapi import FastAPI, Request, Response 
 from fastapi.middleware.cors import CORSMiddleware
 
 # EXISTING ROUTERS
-from app.routers import email_test, booking, admin, utils
+from app.routers import email_test, booking, admin, utils, analytics, jobs, public
 
 # NEW SETTINGS ROUTERS
 from app.routers.settings import (
@@ -19,6 +20,22 @@ from app.routers.settings import (
 # FIREBASE
 from app.services.firebase_setup import db
 
+# OUTBOUND HTTP
+from app.services.http_client import close_http_client
+
+# EMAIL
+from app.services.email_templates import load_templates
+from app.services.email_outbox import outbox_worker
+
+# SETTINGS
+from app.services.settings_store import settings_store
+from app.services import site_bootstrap
+
+# GOOGLE CALENDAR
+from fastapi.concurrency import run_in_threadpool
+from app.routers.google_calendar import warm_calendar_service
+from app.services.calendar_push import calendar_push_worker
+
 
 
 
@@ -69,6 +86,9 @@ app.include_router(booking.router)
 app.include_router(admin.router)
 app.include_router(tasks.router)
 app.include_router(utils.router)
+app.include_router(analytics.router)
+app.include_router(jobs.router)
+app.include_router(public.router)
 
 
 # Settings (ALL admin settings panels)
@@ -81,6 +101,31 @@ app.include_router(media.router, prefix="/admin", tags=["Media"])
 app.include_router(admin_account.router, prefix="/admin", tags=["Admin Account"])
 
 
+# -------------------------------------------------
+# STARTUP / SHUTDOWN
+# -------------------------------------------------
+@app.on_event("startup")
+async def start_background_workers():
+    load_templates()
+    await run_in_threadpool(settings_store.start)
+    await run_in_threadpool(site_bootstrap.rebuild)
+    app.state.outbox_task = asyncio.create_task(outbox_worker())
+    app.state.calendar_push_task = asyncio.create_task(calendar_push_worker())
+    try:
+        await run_in_threadpool(warm_calendar_service)
+    except Exception as e:
+        # Calendar sync is best-effort; the first event insert retries the setup.
+        print(f"Calendar warm-up failed: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_clients():
+    app.state.outbox_task.cancel()
+    app.state.calendar_push_task.cancel()
+    settings_store.stop()
+    await close_http_client()
+
+
 # -------------------------------------------------
 # ROOT ENDPOINT
 # -------------------------------------------------
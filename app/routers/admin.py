@@ -1,15 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from app.auth import verify_admin_token
 from app.services.firebase_setup import db
 from google.cloud import firestore
-from datetime import datetime
+from pydantic import BaseModel
+from typing import List, Optional
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hmac
 import os
-import requests
-from app.services.stripe_invoices import ensure_remaining_invoice, record_invoice_failure
+import threading
+from anyio import from_thread
+from app.services.stripe_invoices import (
+    RECOVERABLE_INVOICE_STATUSES,
+    ensure_remaining_invoice,
+    record_invoice_failure,
+)
+from app.services.distance_service import (
+    BUSINESS_ADDRESS,
+    MAX_DESTINATIONS_PER_REQUEST,
+    METERS_TO_MILES,
+    get_distance_meters_many,
+    get_stats as get_distance_stats,
+)
+from app.services.distance_estimate import calibrate_road_factor
+from app.services.jobs import create_job, register_job, run_job
+from app.services.email_service import get_backup_read_stats
+from app.services import stripe_gateway, stripe_reconciliation  # noqa: F401  (registers the job)
+from app.services.collection_version import bump_collection_version
+from app.services.booking_history import add_history_entry, delete_history, list_history
+from app.services.booking_export import DEFAULT_EXPORT_FIELDS, iter_csv, iter_ndjson, gzip_stream
+from app.services import calendar_feed, calendar_sync  # noqa: F401  (registers the job)
+from app.services.calendar_push import enqueue_calendar_push
+from app.services import token_verifier
+from app.services.settings_store import settings_store
+from app.services.http_cache import etag_matches
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
-BUSINESS_ADDRESS = "69 Thompson Road SE, Silver Creek, GA 30173"
+BACKFILL_PAGE_SIZE = 100
+BACKFILL_CONCURRENCY = 4
+
+RECOVERY_PAGE_SIZE = 50
+RECOVERY_CONCURRENCY = 4
+
+BULK_OPERATION_TYPES = {"status", "patch", "note", "delete"}
+BULK_MAX_OPERATIONS = 500
+# gRPC codes worth retrying: DEADLINE_EXCEEDED, RESOURCE_EXHAUSTED, ABORTED, INTERNAL, UNAVAILABLE
+BULK_RETRYABLE_CODES = {4, 8, 10, 13, 14}
+BULK_MAX_ATTEMPTS = 3
+
+
+class BulkOperation(BaseModel):
+    op: str
+    id: str
+    status: Optional[str] = None
+    updates: Optional[dict] = None
+    note: Optional[str] = None
+
+
+class BulkRequest(BaseModel):
+    operations: List[BulkOperation]
 
 
 def calculate_mileage_fee(miles: int) -> float:
@@ -24,34 +76,6 @@ def calculate_mileage_fee(miles: int) -> float:
     return 27 + (miles - 40) * 3
 
 
-def lookup_distance_miles(destination: str) -> int:
-    api_key = os.getenv("GOOGLE_MAPS_API_KEY")
-    if not api_key:
-        raise RuntimeError("GOOGLE_MAPS_API_KEY is not configured")
-
-    response = requests.get(
-        "https://maps.googleapis.com/maps/api/distancematrix/json",
-        params={
-            "origins": BUSINESS_ADDRESS,
-            "destinations": destination,
-            "units": "imperial",
-            "key": api_key,
-        },
-        timeout=15,
-    )
-    response.raise_for_status()
-    payload = response.json()
-    if payload.get("status") != "OK":
-        raise RuntimeError(f"Google API error: {payload.get('status', 'Unknown')}")
-
-    element = payload["rows"][0]["elements"][0]
-    if element.get("status") != "OK":
-        raise RuntimeError(f"Google route error: {element.get('status', 'Unknown')}")
-
-    meters = element["distance"]["value"]
-    return round(meters * 0.000621371)
-
-
 # -------------------------
 # GET ALL BOOKINGS
 # -------------------------
@@ -102,77 +126,423 @@ def get_all_bookings(user=Depends(verify_admin_token)):
     return {"bookings": bookings}
 
 
-@router.post("/bookings/backfill-mileage")
-def backfill_booking_mileage(user=Depends(verify_admin_token)):
-    updated = []
-    skipped = []
-    failed = []
+# -------------------------
+# EXPORT BOOKINGS (streamed)
+# -------------------------
+@router.get("/bookings/export")
+def export_bookings(
+    request: Request,
+    format: str = "csv",
+    date_from: str = Query(None, alias="from"),
+    date_to: str = Query(None, alias="to"),
+    fields: str = None,
+    user=Depends(verify_admin_token),
+):
+    """
+    Stream bookings as CSV or NDJSON while Firestore pages arrive, so memory
+    stays flat regardless of collection size. Gzip is applied on the fly
+    when the client sends Accept-Encoding: gzip.
+    """
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'")
 
-    for doc in db.collection("bookings").stream():
-        data = doc.to_dict()
-        if data.get("distance") is not None:
-            skipped.append({"id": doc.id, "reason": "already populated"})
-            continue
+    selected = [f.strip() for f in fields.split(",") if f.strip()] if fields else DEFAULT_EXPORT_FIELDS
+
+    if format == "csv":
+        body = iter_csv(selected, date_from, date_to)
+        media_type = "text/csv"
+    else:
+        body = iter_ndjson(selected, date_from, date_to)
+        media_type = "application/x-ndjson"
+
+    headers = {"Content-Disposition": f'attachment; filename="bookings.{format}"'}
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+
+    return StreamingResponse(body, media_type=media_type, headers=headers)
 
-        address = str(data.get("address") or data.get("location") or "").strip()
-        if not address or address.lower() == "not provided":
-            skipped.append({"id": doc.id, "reason": "missing address"})
+
+# -------------------------
+# BULK OPERATIONS
+# -------------------------
+def _bulk_write_payload(op: BulkOperation, actor: str):
+    """Build the update and history entry for a status/patch/note op."""
+    if op.op == "status":
+        if not op.status:
+            raise ValueError("status operation requires 'status'")
+        changes = {"status": op.status}
+    elif op.op == "note":
+        if op.note is None:
+            raise ValueError("note operation requires 'note'")
+        changes = {"adminNote": op.note}
+    else:
+        if not op.updates:
+            raise ValueError("patch operation requires 'updates'")
+        if "history" in op.updates:
+            raise ValueError("history cannot be patched directly")
+        changes = dict(op.updates)
+
+    history_entry = {
+        "type": op.op if op.op != "patch" else "update",
+        "changes": changes,
+        "source": "bulk",
+        "actor": actor,
+    }
+    return changes, history_entry
+
+
+@router.post("/bookings/bulk")
+def bulk_booking_operations(payload: BulkRequest, user=Depends(verify_admin_token)):
+    """
+    Apply many status/patch/note/delete operations through one BulkWriter.
+    Each operation reports its own result; the bookings collection version
+    is bumped once for the whole request.
+    """
+    operations = payload.operations
+    if not operations:
+        raise HTTPException(status_code=400, detail="No operations provided.")
+    if len(operations) > BULK_MAX_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_OPERATIONS} operations per request.")
+
+    results = [None] * len(operations)
+    pending = defaultdict(deque)
+    history_entries = {}  # index -> history entry, written once the update succeeds
+    history_writes = []
+    lock = threading.Lock()
+    actor = (user or {}).get("email", "admin")
+
+    def on_result(reference, write_result, bulk_writer):
+        with lock:
+            # History deletes share the writer but carry no result of their own.
+            if not pending.get(reference.path):
+                return
+            index = pending[reference.path].popleft()
+            results[index] = {"index": index, "id": operations[index].id, "op": operations[index].op, "status": "ok"}
+            if index in history_entries:
+                history_writes.append((operations[index].id, history_entries[index]))
+                enqueue_calendar_push(operations[index].id, history_entries[index]["changes"].keys())
+
+    def on_error(failure, bulk_writer):
+        if failure.code in BULK_RETRYABLE_CODES and failure.attempts < BULK_MAX_ATTEMPTS:
+            return True
+        with lock:
+            path = failure.operation.reference.path
+            if not pending.get(path):
+                print(f"Bulk history write failed ({path}): {failure.message}")
+                return False
+            index = pending[path].popleft()
+            results[index] = {
+                "index": index,
+                "id": operations[index].id,
+                "op": operations[index].op,
+                "status": "error",
+                "reason": failure.message,
+            }
+        return False
+
+    writer = db.bulk_writer()
+    writer.on_write_result(on_result)
+    writer.on_write_error(on_error)
+
+    for index, op in enumerate(operations):
+        if op.op not in BULK_OPERATION_TYPES:
+            results[index] = {"index": index, "id": op.id, "op": op.op, "status": "error", "reason": "unknown operation"}
             continue
 
+        doc_ref = db.collection("bookings").document(op.id)
         try:
-            miles = lookup_distance_miles(address)
-            mileage_fee = calculate_mileage_fee(miles) * 4
-            doc.reference.update({
+            changes, history_entry = (None, None) if op.op == "delete" else _bulk_write_payload(op, actor)
+        except ValueError as exc:
+            results[index] = {"index": index, "id": op.id, "op": op.op, "status": "error", "reason": str(exc)}
+            continue
+
+        with lock:
+            pending[doc_ref.path].append(index)
+            if history_entry is not None:
+                history_entries[index] = history_entry
+        if changes is None:
+            writer.delete(doc_ref)
+            delete_history(writer, op.id)
+        else:
+            writer.update(doc_ref, changes)
+
+    writer.close()
+
+    # History is only recorded for updates that actually landed (a missing
+    # booking fails NOT_FOUND and must not leave an orphaned entry behind).
+    if history_writes:
+        history_writer = db.bulk_writer()
+        history_writer.on_write_error(on_error)
+        for booking_id, history_entry in history_writes:
+            add_history_entry(history_writer, booking_id, history_entry)
+        history_writer.close()
+
+    succeeded = sum(1 for r in results if r and r["status"] == "ok")
+    if succeeded:
+        bump_collection_version("bookings")
+
+    return {
+        "succeeded": succeeded,
+        "failed": len(operations) - succeeded,
+        "results": results,
+    }
+
+
+# -------------------------
+# MILEAGE BACKFILL (background job)
+# -------------------------
+def _needs_mileage(data: dict):
+    """Return the address to look up, or a skip reason."""
+    if data.get("distance") is not None:
+        return None, "already populated"
+    address = str(data.get("address") or data.get("location") or "").strip()
+    if not address or address.lower() == "not provided":
+        return None, "missing address"
+    return address, None
+
+
+async def _resolve_backfill_addresses(addresses: list) -> dict:
+    """Resolve addresses in chunks of 25 with a bounded number of requests in flight."""
+    semaphore = asyncio.Semaphore(BACKFILL_CONCURRENCY)
+    resolved = {}
+
+    async def resolve_chunk(chunk):
+        async with semaphore:
+            try:
+                resolved.update(await get_distance_meters_many(BUSINESS_ADDRESS, chunk))
+            except Exception as exc:
+                for address in chunk:
+                    resolved[address] = exc
+
+    chunks = [
+        addresses[i:i + MAX_DESTINATIONS_PER_REQUEST]
+        for i in range(0, len(addresses), MAX_DESTINATIONS_PER_REQUEST)
+    ]
+    await asyncio.gather(*(resolve_chunk(chunk) for chunk in chunks))
+    return resolved
+
+
+def _run_mileage_backfill(job):
+    """
+    Page through bookings by document id, resolve up to 25 destinations per
+    Distance Matrix request with a few requests in flight, and commit each
+    page in one batch before checkpointing the cursor.
+
+    Runs in a BackgroundTasks worker thread; lookups hop onto the event loop
+    so they share the pooled HTTP client.
+    """
+    query = (
+        db.collection("bookings")
+        .select(["distance", "address", "location"])
+        .order_by("__name__")
+        .limit(BACKFILL_PAGE_SIZE)
+    )
+
+    while True:
+        page_query = query
+        if job.cursor:
+            page_query = query.start_after({"__name__": db.collection("bookings").document(job.cursor)})
+        page = list(page_query.stream())
+        if not page:
+            break
+
+        targets = {}
+        for doc in page:
+            address, reason = _needs_mileage(doc.to_dict() or {})
+            if reason:
+                job.count("skipped")
+            else:
+                targets[doc.id] = address
+
+        addresses = list(dict.fromkeys(targets.values()))
+        resolved = from_thread.run(_resolve_backfill_addresses, addresses) if addresses else {}
+
+        batch = db.batch()
+        writes = 0
+        for booking_id, address in targets.items():
+            meters = resolved.get(address)
+            if meters is None or isinstance(meters, Exception):
+                job.fail({"id": booking_id, "reason": str(meters or "no result")})
+                continue
+            miles = round(meters * METERS_TO_MILES)
+            batch.update(db.collection("bookings").document(booking_id), {
                 "distance": miles,
-                "mileageFee": mileage_fee,
+                "mileageFee": calculate_mileage_fee(miles) * 4,
                 "mileageBackfilledAt": firestore.SERVER_TIMESTAMP,
             })
-            updated.append({
-                "id": doc.id,
-                "distance": miles,
-                "mileageFee": mileage_fee,
-            })
-        except Exception as exc:
-            failed.append({"id": doc.id, "reason": str(exc)})
+            writes += 1
+        if writes:
+            batch.commit()
 
-    return {
-        "updated": len(updated),
-        "skipped": len(skipped),
-        "failed": len(failed),
-        "updatedBookings": updated,
-        "failures": failed,
-    }
+        job.count("updated", writes)
+        job.count("processed", len(page))
+        job.checkpoint(cursor=page[-1].id)
+
+        if len(page) < BACKFILL_PAGE_SIZE:
+            break
+
+    return {key: job.progress.get(key, 0) for key in ("processed", "updated", "skipped", "failed")}
+
+
+register_job("mileage_backfill", _run_mileage_backfill)
+
+
+@router.post("/bookings/backfill-mileage")
+def backfill_booking_mileage(background_tasks: BackgroundTasks, user=Depends(verify_admin_token)):
+    """Queue the mileage backfill; poll GET /admin/jobs/{id} for progress."""
+    job_id = create_job("mileage_backfill", actor=(user or {}).get("email"))
+    background_tasks.add_task(run_job, job_id)
+    return {"jobId": job_id, "status": "queued", "progressUrl": f"/admin/jobs/{job_id}"}
+
+
+# -------------------------
+# STRIPE INVOICE RECOVERY (background job)
+# -------------------------
+def _recover_invoice(doc):
+    booking = doc.to_dict() or {}
+    booking["id"] = doc.id
+    try:
+        return doc.id, ensure_remaining_invoice(booking, doc.reference), None
+    except Exception as exc:
+        record_invoice_failure(doc.id, exc)
+        return doc.id, None, exc
+
+
+def _run_invoice_recovery(job):
+    """
+    Walk deposit_paid bookings whose invoice is missing, failed or unsent
+    (an indexed query), recovering each page on a bounded worker pool and
+    checkpointing the cursor between pages.
+    """
+    bookings = db.collection("bookings").where("paymentStatus", "==", "deposit_paid")
+    if job.params.get("includeLegacy"):
+        # Older bookings may have no invoice status at all. Recovery writes
+        # one on every booking it touches, so later runs stay on the index.
+        query = bookings
+    else:
+        query = bookings.where("stripe_invoice_status", "in", RECOVERABLE_INVOICE_STATUSES)
+    query = query.order_by("__name__").limit(RECOVERY_PAGE_SIZE)
+
+    with ThreadPoolExecutor(max_workers=RECOVERY_CONCURRENCY) as pool:
+        while True:
+            page_query = query
+            if job.cursor:
+                page_query = query.start_after({"__name__": db.collection("bookings").document(job.cursor)})
+            page = list(page_query.stream())
+            if not page:
+                break
+
+            targets = []
+            for doc in page:
+                status = (doc.to_dict() or {}).get("stripe_invoice_status")
+                if status is None or status in RECOVERABLE_INVOICE_STATUSES:
+                    targets.append(doc)
+                else:
+                    job.count("skipped")
+
+            for booking_id, result, error in pool.map(_recover_invoice, targets):
+                if error is not None:
+                    job.fail({"id": booking_id, "reason": str(error)[:300]})
+                else:
+                    job.count("recovered")
+                    job.count(f"status_{result.get('status', 'unknown')}")
+
+            job.count("processed", len(page))
+            job.checkpoint(cursor=page[-1].id)
+
+            if len(page) < RECOVERY_PAGE_SIZE:
+                break
+
+    return dict(job.progress)
+
+
+register_job("stripe_invoice_recovery", _run_invoice_recovery)
 
 
 @router.post("/bookings/recover-stripe-invoices")
-def recover_stripe_invoices(user=Depends(verify_admin_token)):
-    """Create or resend missing balance invoices for paid deposits."""
-    recovered = []
-    skipped = []
-    failed = []
-
-    for doc in db.collection("bookings").stream():
-        booking = doc.to_dict() or {}
-        booking["id"] = doc.id
-
-        if booking.get("paymentStatus") != "deposit_paid":
-            skipped.append({"id": doc.id, "reason": "deposit not paid or balance already paid"})
-            continue
+def recover_stripe_invoices(background_tasks: BackgroundTasks, include_legacy: bool = False, user=Depends(verify_admin_token)):
+    """Queue recovery of missing balance invoices; poll GET /admin/jobs/{id}."""
+    job_id = create_job(
+        "stripe_invoice_recovery",
+        params={"includeLegacy": include_legacy},
+        actor=(user or {}).get("email"),
+    )
+    background_tasks.add_task(run_job, job_id)
+    return {"jobId": job_id, "status": "queued", "progressUrl": f"/admin/jobs/{job_id}"}
 
-        try:
-            result = ensure_remaining_invoice(booking, doc.reference)
-            recovered.append({"id": doc.id, **result})
-        except Exception as exc:
-            record_invoice_failure(doc.id, exc)
-            failed.append({"id": doc.id, "reason": str(exc)})
 
-    return {
-        "recovered": len(recovered),
-        "skipped": len(skipped),
-        "failed": len(failed),
-        "recoveredBookings": recovered,
-        "failures": failed,
-    }
+# -------------------------
+# STRIPE RECONCILIATION (background job)
+# -------------------------
+@router.post("/stripe/reconcile")
+def reconcile_stripe(
+    background_tasks: BackgroundTasks,
+    created_since: Optional[int] = None,
+    dry_run: bool = False,
+    user=Depends(verify_admin_token),
+):
+    """
+    Queue a sweep of remaining-balance invoices against bookings. The diff
+    report is in the job summary at GET /admin/jobs/{id}.
+    """
+    job_id = create_job(
+        "stripe_reconciliation",
+        params={"createdSince": created_since, "dryRun": dry_run},
+        actor=(user or {}).get("email"),
+    )
+    background_tasks.add_task(run_job, job_id)
+    return {"jobId": job_id, "status": "queued", "progressUrl": f"/admin/jobs/{job_id}"}
+
+
+# -------------------------
+# GOOGLE CALENDAR RECONCILIATION (background job)
+# -------------------------
+@router.post("/calendar/reconcile")
+def reconcile_calendar(background_tasks: BackgroundTasks, dry_run: bool = False, user=Depends(verify_admin_token)):
+    """Queue a sync of missing or stale Google Calendar events for paid, upcoming bookings."""
+    job_id = create_job(
+        "calendar_reconciliation",
+        params={"dryRun": dry_run},
+        actor=(user or {}).get("email"),
+    )
+    background_tasks.add_task(run_job, job_id)
+    return {"jobId": job_id, "status": "queued", "progressUrl": f"/admin/jobs/{job_id}"}
+
+
+@router.get("/stripe/metrics")
+def stripe_metrics(user=Depends(verify_admin_token)):
+    """Per-endpoint Stripe call counts, retries, errors and latency histograms."""
+    return stripe_gateway.get_metrics()
+
+
+# -------------------------
+# EMAIL BACKUP-READ STATS
+# -------------------------
+@router.get("/email/stats")
+def email_backup_stats(user=Depends(verify_admin_token)):
+    return get_backup_read_stats()
+
+
+# -------------------------
+# DISTANCE CACHE STATS
+# -------------------------
+@router.get("/auth/stats")
+def auth_token_stats(user=Depends(verify_admin_token)):
+    """Verified-token cache hit rate and verification latency."""
+    return token_verifier.get_stats()
+
+
+@router.get("/distance/stats")
+def distance_cache_stats(user=Depends(verify_admin_token)):
+    return get_distance_stats()
+
+
+@router.post("/distance/calibrate")
+def calibrate_distance_estimates(user=Depends(verify_admin_token)):
+    """Refit the offline estimator's road factor from cached exact distances."""
+    return calibrate_road_factor()
 
 
 # -------------------------
@@ -199,6 +569,8 @@ def get_booking(booking_id: str, user=Depends(verify_admin_token)):
     data["items"] = data.get("items") or []
     data["adminNote"] = data.get("adminNote") or "" 
     data["status"] = data.get("status") or "Pending" 
+    # Older bookings may still carry an inline history array; new entries
+    # are served by GET /bookings/{booking_id}/history.
     data["history"] = data.get("history", [])
 
     return data
@@ -210,6 +582,7 @@ def get_booking(booking_id: str, user=Depends(verify_admin_token)):
 @router.put("/bookings/{booking_id}")
 def update_booking(booking_id: str, updated_data: dict, user=Depends(verify_admin_token)):
     db.collection("bookings").document(booking_id).update(updated_data)
+    enqueue_calendar_push(booking_id, updated_data.keys())
     return {"message": "Booking updated successfully"}
 
 
@@ -219,6 +592,7 @@ def update_booking(booking_id: str, updated_data: dict, user=Depends(verify_admi
 @router.patch("/bookings/{booking_id}/status")
 def update_status(booking_id: str, status: str, user=Depends(verify_admin_token)):
     db.collection("bookings").document(booking_id).update({"status": status})
+    enqueue_calendar_push(booking_id, ["status"])
     return {"message": "Status updated"}
 
 
@@ -237,7 +611,8 @@ def add_note(booking_id: str, note: str, user=Depends(verify_admin_token)):
 # -------------------------
 @router.delete("/bookings/{booking_id}")
 def delete_booking(booking_id: str, user=Depends(verify_admin_token)):
-    db.collection("bookings").document(booking_id).delete()
+    # Removes the bookings/{id}/history subcollection along with the booking.
+    db.recursive_delete(db.collection("bookings").document(booking_id))
     return {"message": "Booking deleted"}
 
 
@@ -290,19 +665,58 @@ def filter_by_item(item: str, user=Depends(verify_admin_token)):
 @router.patch("/bookings/{booking_id}")
 def patch_booking(booking_id: str, updates: dict, user=Depends(verify_admin_token)):
     doc_ref = db.collection("bookings").document(booking_id)
-    doc_ref.update(updates)
-
-    # Optional: append to history
-    doc_ref.update({
-        "history": firestore.ArrayUnion([{
-            "type": "update",
-            "changes": updates,
-            "timestamp": firestore.SERVER_TIMESTAMP
-        }])
+
+    # History lives in bookings/{id}/history and commits with the update.
+    batch = db.batch()
+    batch.update(doc_ref, updates)
+    add_history_entry(batch, booking_id, {
+        "type": "update",
+        "changes": updates,
     })
+    batch.commit()
+    enqueue_calendar_push(booking_id, updates.keys())
 
     return {"message": "Booking updated"}
+
+
+# -------------------------
+# BOOKING HISTORY (paginated)
+# -------------------------
+@router.get("/bookings/{booking_id}/history")
+def get_booking_history(booking_id: str, limit: int = 25, cursor: str = None, user=Depends(verify_admin_token)):
+    try:
+        return list_history(booking_id, limit=limit, cursor=cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     
+# -------------------------
+# CALENDAR SUBSCRIPTION FEED (.ics)
+# -------------------------
+def _verify_calendar_feed_access(token: str = None, authorization: str = Header(None)):
+    """
+    Calendar apps cannot send a Firebase bearer token, so the feed also
+    accepts the secret CALENDAR_FEED_TOKEN as a query parameter.
+    """
+    feed_token = os.getenv("CALENDAR_FEED_TOKEN")
+    if token:
+        if feed_token and hmac.compare_digest(token, feed_token):
+            return {"feed": True}
+        raise HTTPException(status_code=401, detail="Invalid feed token")
+    return verify_admin_token(authorization)
+
+
+@router.get("/calendar.ics")
+def get_calendar_feed(request: Request, access=Depends(_verify_calendar_feed_access)):
+    etag, body = calendar_feed.get_feed()
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, max-age=0, must-revalidate",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="text/calendar; charset=utf-8", headers=headers)
+
+
 # -------------------------
 # CALENDAR EVENTS (grouped by date)
 # -------------------------
@@ -341,11 +755,10 @@ def get_calendar_events(user=Depends(verify_admin_token)):
     
 @router.get("/settings/promotions")
 def get_promotions_settings(user=Depends(verify_admin_token)):
-    doc_ref = db.collection("siteSettings").document("promotions").get()
-    if not doc_ref.exists:
+    data = settings_store.get("siteSettings", "promotions")
+    if data is None:
         return {"enabled": False, "message": ""}
 
-    data = doc_ref.to_dict()
     return {
         "enabled": data.get("enabled", False),
         "message": data.get("message", "")
@@ -386,14 +799,16 @@ def create_new_booking(booking_data: dict, user=Depends(verify_admin_token)):
         booking_data["status"] = booking_data.get("status") or "Active"
         booking_data["paymentStatus"] = booking_data.get("paymentStatus") or "confirmed"
         booking_data["createdAt"] = firestore.SERVER_TIMESTAMP
-        booking_data["history"] = [{
-            "type": "creation",
-            "message": "Manual in-person order created by administrator.",
-            "timestamp": datetime.utcnow().isoformat()
-        }]
+        booking_data.pop("history", None)
 
         new_doc_ref = db.collection("bookings").document()
-        new_doc_ref.set(booking_data)
+        batch = db.batch()
+        batch.set(new_doc_ref, booking_data)
+        add_history_entry(batch, new_doc_ref.id, {
+            "type": "creation",
+            "message": "Manual in-person order created by administrator.",
+        })
+        batch.commit()
         
         return {
             "message": "In-person booking created successfully", 
@@ -415,5 +830,6 @@ def update_promotions_settings(payload: dict, user=Depends(verify_admin_token)):
         "message": message,
         "updatedAt": firestore.SERVER_TIMESTAMP
     })
+    settings_store.note_write("siteSettings", "promotions", {"enabled": enabled, "message": message}, merge=False)
 
     return {"message": "Promotions updated"}
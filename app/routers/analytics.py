@@ -0,0 +1,64 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from app.auth import verify_admin_token
+from app.services import analytics_store
+
+router = APIRouter(prefix="/admin/analytics", tags=["Analytics"])
+
+
+def _validate_range(start: Optional[str], end: Optional[str]):
+    for value in (start, end):
+        if value is None:
+            continue
+        try:
+            date.fromisoformat(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid date '{value}', expected YYYY-MM-DD")
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="'start' must be on or before 'end'")
+
+
+# -------------------------
+# REFRESH SNAPSHOT
+# -------------------------
+@router.post("/refresh")
+def refresh_snapshot(user=Depends(verify_admin_token)):
+    return analytics_store.sync_snapshot(force=True)
+
+
+# -------------------------
+# REVENUE BY MONTH
+# -------------------------
+@router.get("/revenue")
+def revenue_by_month(start: Optional[str] = None, end: Optional[str] = None, user=Depends(verify_admin_token)):
+    _validate_range(start, end)
+    return {"months": analytics_store.revenue_by_month(start, end)}
+
+
+# -------------------------
+# ITEM UTILIZATION
+# -------------------------
+@router.get("/utilization")
+def item_utilization(start: str, end: str, user=Depends(verify_admin_token)):
+    _validate_range(start, end)
+    return analytics_store.item_utilization(start, end)
+
+
+# -------------------------
+# AVERAGE LEAD TIME
+# -------------------------
+@router.get("/lead-time")
+def average_lead_time(start: Optional[str] = None, end: Optional[str] = None, user=Depends(verify_admin_token)):
+    _validate_range(start, end)
+    return analytics_store.average_lead_time(start, end)
+
+
+# -------------------------
+# WET VS DRY MIX
+# -------------------------
+@router.get("/wet-dry")
+def wet_dry_mix(start: Optional[str] = None, end: Optional[str] = None, user=Depends(verify_admin_token)):
+    _validate_range(start, end)
+    return {"mix": analytics_store.wet_dry_mix(start, end)}
@@ -8,7 +8,7 @@ from square.client import Client
 from square.utilities.webhooks_helper import is_valid_webhook_event_signature
 from app.automation.lifecycle import run_lifecycle, run_overdue_autopay, fix_old_dates, fix_remaining_fields
 from datetime import datetime, timedelta
-from .google_calendar import build_event_times, create_booking_event
+from .google_calendar import build_event_body, build_event_times, create_booking_event, event_hash
 import stripe
 import os
 import uuid
@@ -21,6 +21,8 @@ from app.triggers.on_balance_paid import handle_balance_paid
 from app.triggers.on_event_canceled import handle_event_canceled
 from app.triggers.on_event_reminder import handle_event_reminder
 from app.triggers.on_reengagement import send_anniversary_reminders
+from app.services import stripe_gateway
+from app.services.invoice_state import record_invoice_event
 from app.services.stripe_invoices import (
     ensure_remaining_invoice,
     record_invoice_failure,
@@ -29,9 +31,15 @@ from app.services.stripe_invoices import (
 
 router = APIRouter(prefix="/book", tags=["booking"])
 
-# Initialize Stripe globally
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY") # This should be your sk_live_... key
+# Stripe API calls go through stripe_gateway, which also sets the API key
 endpoint_secret = os.getenv("STRIPE_WEBHOOK_SECRET") # Your whsec_... key
+
+INVOICE_STATE_EVENTS = (
+    "invoice.finalized",
+    "invoice.sent",
+    "invoice.voided",
+    "invoice.marked_uncollectible",
+)
 # ---------------------------------------------------------
 # MODELS & SCHEMAS
 # ---------------------------------------------------------
@@ -165,7 +173,7 @@ async def validate_coupon(data: dict):
     }
 
 @router.post("/create-checkout")
-async def create_checkout(data: dict):
+def create_checkout(data: dict):
     """
     Refined checkout flow: Creates Stripe customer, calculates exact pricing,
     saves pending record, and generates a Stripe Checkout Session.
@@ -220,7 +228,8 @@ async def create_checkout(data: dict):
 
     try:
         # 4. Create Stripe Customer
-        customer = stripe.Customer.create(
+        customer = stripe_gateway.call(
+            "Customer.create",
             name=customer_name,
             email=customer_email,
             phone=customer_phone,
@@ -229,7 +238,8 @@ async def create_checkout(data: dict):
         
         # 5. Create Stripe Checkout Session
         # 'setup_future_usage' allows us to charge the balance 2 days before the event
-        session = stripe.checkout.Session.create(
+        session = stripe_gateway.call(
+            "checkout.Session.create",
             customer=customer.id,
             payment_method_types=['card'],
             allow_promotion_codes=True,
@@ -330,7 +340,7 @@ def _process_stripe_event(event):
         payment_intent_id = session_dict.get('payment_intent')
         
         if payment_intent_id:
-            intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+            intent = stripe_gateway.call("PaymentIntent.retrieve", payment_intent_id)
             payment_method = intent.payment_method
             intent_id = intent.id
         else:
@@ -349,6 +359,8 @@ def _process_stripe_event(event):
                     "stripe_payment_intent": intent_id,
                     "stripe_customer_id": customer_id or booking.get("stripe_customer_id"),
                 }
+                if not booking.get("stripe_invoice_status"):
+                    update_payload["stripe_invoice_status"] = "pending"
                 doc_ref.update(update_payload)
                 booking.update(update_payload)
 
@@ -370,7 +382,7 @@ def _process_stripe_event(event):
                     # Send the confirmation after the Stripe invoice exists so
                     # the email can link to the hosted invoice page.
                     confirmation_result = handle_deposit_received(booking)
-                    if confirmation_result.get("status") == "success":
+                    if confirmation_result.get("status") in ("success", "queued"):
                         doc_ref.update({"deposit_confirmation_sent": True})
 
                 if not booking.get("google_event_id"):
@@ -381,7 +393,10 @@ def _process_stripe_event(event):
                             "start": start,
                             "end": end
                         })
-                        doc_ref.update({"google_event_id": event_id})
+                        doc_ref.update({
+                            "google_event_id": event_id,
+                            "google_event_hash": event_hash(build_event_body(booking)),
+                        })
                     except Exception as cal_err:
                         print(f"Calendar Sync Error: {cal_err}")
 
@@ -403,6 +418,11 @@ def _process_stripe_event(event):
                 "stripe_invoice_failure_notified": True
             })
 
+    elif event['type'] in INVOICE_STATE_EVENTS:
+        # Keep the cached invoice state current so autopay and recovery can
+        # skip stripe.Invoice.retrieve.
+        record_invoice_event(event['data']['object'])
+
 
 @router.post("/webhooks/stripe", status_code=200)
 async def stripe_webhook(request: Request, background_tasks: BackgroundTasks):
@@ -1,46 +1,96 @@
 import os
 import json
-from datetime import datetime
-import pytz
+import hashlib
+import threading
+import httplib2
+from google.auth.transport.requests import Request as AuthRequest
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
+from app.automation.lifecycle import normalize_date
+from app.services.calendar_feed import BUSINESS_TIMEZONE, event_window
 
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
 CALENDAR_ID = "buzzysentertainment@gmail.com"  # Owner's Google Calendar email
+CALENDAR_TIMEOUT_SECONDS = 20
 
+# One Calendar client per process, built from the discovery document bundled
+# with google-api-python-client, and one set of credentials that refreshes its
+# own access token. httplib2 is not thread-safe, so each thread executes
+# requests over its own authorized connection.
+_credentials = None
+_service = None
+_service_lock = threading.Lock()
+_thread_http = threading.local()
 
-def get_calendar_service():
+
+def get_credentials():
     """
     Loads Google service account credentials from the environment variable
     GOOGLE_SERVICE_ACCOUNT_JSON instead of a local file.
     """
-    service_account_info = json.loads(os.environ["GOOGLE_SERVICE_ACCOUNT_JSON"])
-    creds = service_account.Credentials.from_service_account_info(
-        service_account_info,
-        scopes=SCOPES,
-    )
-    return build("calendar", "v3", credentials=creds)
+    global _credentials
+    if _credentials is None:
+        with _service_lock:
+            if _credentials is None:
+                service_account_info = json.loads(os.environ["GOOGLE_SERVICE_ACCOUNT_JSON"])
+                _credentials = service_account.Credentials.from_service_account_info(
+                    service_account_info,
+                    scopes=SCOPES,
+                )
+    return _credentials
 
 
-def build_event_times(booking):
-    """
-    Combine booking date + delivery/pickup times into proper ISO datetimes.
-    """
-    tz = pytz.timezone("America/Chicago")  # adjust to your client’s timezone
-    raw_date = booking.get("date")  # e.g. "05/20/2026"
-    start_time = booking.get("deliveryTime", "10:00 AM")
-    end_time = booking.get("pickupTime", "6:00 PM")
+def get_calendar_service():
+    global _service
+    if _service is None:
+        credentials = get_credentials()
+        with _service_lock:
+            if _service is None:
+                _service = build(
+                    "calendar", "v3",
+                    credentials=credentials,
+                    static_discovery=True,
+                    cache_discovery=False,
+                )
+    return _service
 
-    # Parse MM/DD/YYYY + time → datetime
-    start_dt = tz.localize(datetime.strptime(f"{raw_date} {start_time}", "%m/%d/%Y %I:%M %p"))
-    end_dt = tz.localize(datetime.strptime(f"{raw_date} {end_time}", "%m/%d/%Y %I:%M %p"))
 
-    return start_dt.isoformat(), end_dt.isoformat()
+def _authorized_http():
+    http = getattr(_thread_http, "http", None)
+    if http is None:
+        http = AuthorizedHttp(get_credentials(), http=httplib2.Http(timeout=CALENDAR_TIMEOUT_SECONDS))
+        _thread_http.http = http
+    return http
 
 
-def create_booking_event(booking):
-    service = get_calendar_service()
+def execute(request):
+    """Run a Calendar API request on this thread's connection."""
+    return request.execute(http=_authorized_http(), num_retries=2)
+
+
+def warm_calendar_service():
+    """Build the client and mint the first access token ahead of the first webhook."""
+    get_calendar_service()
+    credentials = get_credentials()
+    if not credentials.valid:
+        credentials.refresh(AuthRequest())
+
+
+def build_event_times(booking):
+    """
+    Combine booking date + delivery/pickup times into proper ISO datetimes
+    in the business timezone. Accepts any stored date format and falls back
+    to default times when a time is missing or "TBD".
+    """
+    event_date = normalize_date(booking.get("date") or booking.get("eventDate"))
+    if not event_date:
+        raise ValueError("Booking has no event date")
+    start, end = event_window(booking, event_date)
+    return start.astimezone(BUSINESS_TIMEZONE).isoformat(), end.astimezone(BUSINESS_TIMEZONE).isoformat()
+
 
+def build_event_body(booking):
     summary = f"Buzzy’s Booking – {booking.get('name', 'Unknown')}"
     location = booking.get("address", "No address provided")
 
@@ -50,13 +100,14 @@ def create_booking_event(booking):
         f"\n\nTotal: ${booking.get('total', 0)}\n"
         f"Phone: {booking.get('phone', '')}\n"
         f"Email: {booking.get('email', '')}\n"
-        f"Status: {booking.get('status', 'Pending')}"
+        f"Status: {booking.get('status', 'Pending')}\n"
+        f"Payment: {booking.get('paymentStatus', 'Pending')}"
     )
 
     # Build proper start/end times
     start, end = build_event_times(booking)
 
-    event_body = {
+    return {
         "summary": summary,
         "location": location,
         "description": description,
@@ -64,40 +115,54 @@ def create_booking_event(booking):
         "end": {"dateTime": end},
     }
 
-    event = service.events().insert(calendarId=CALENDAR_ID, body=event_body).execute()
+
+def event_hash(event_body):
+    """Content hash stored as google_event_hash to detect stale calendar events."""
+    canonical = json.dumps(event_body, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def create_booking_event(booking):
+    service = get_calendar_service()
+    event_body = build_event_body(booking)
+    event = execute(service.events().insert(calendarId=CALENDAR_ID, body=event_body))
     return event.get("id")
 
 
 def update_booking_event(event_id, booking):
     service = get_calendar_service()
+    event_body = build_event_body(booking)
+    updated_event = execute(service.events().update(
+        calendarId=CALENDAR_ID,
+        eventId=event_id,
+        body=event_body
+    ))
 
-    summary = f"Buzzy’s Booking – {booking.get('name', 'Unknown')}"
-    location = booking.get("address", "No address provided")
+    return updated_event.get("id")
 
-    description = (
-        f"Items:\n" +
-        "\n".join([f"- {i.get('title')}" for i in booking.get("items", [])]) +
-        f"\n\nTotal: ${booking.get('total', 0)}\n"
-        f"Phone: {booking.get('phone', '')}\n"
-        f"Email: {booking.get('email', '')}\n"
-        f"Status: {booking.get('paymentStatus', 'Pending')}"
-    )
 
-    # Build proper start/end times
-    start, end = build_event_times(booking)
+# -----------------------------
+# BATCH REQUESTS
+# -----------------------------
+MAX_BATCH_REQUESTS = 50
 
-    event_body = {
-        "summary": summary,
-        "location": location,
-        "description": description,
-        "start": {"dateTime": start},
-        "end": {"dateTime": end},
-    }
 
-    updated_event = service.events().update(
-        calendarId=CALENDAR_ID,
-        eventId=event_id,
-        body=event_body
-    ).execute()
+def execute_batch(requests):
+    """
+    Send up to MAX_BATCH_REQUESTS calls in one HTTP request to the batch
+    endpoint. `requests` is [(request_id, request)]; returns
+    {request_id: (response, exception)}.
+    """
+    if len(requests) > MAX_BATCH_REQUESTS:
+        raise ValueError(f"At most {MAX_BATCH_REQUESTS} requests per batch")
 
-    return updated_event.get("id")
+    results = {}
+
+    def collect(request_id, response, exception):
+        results[request_id] = (response, exception)
+
+    batch = get_calendar_service().new_batch_http_request(callback=collect)
+    for request_id, request in requests:
+        batch.add(request, request_id=request_id)
+    batch.execute(http=_authorized_http())
+    return results
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from app.auth import verify_admin_token
+from app.services.jobs import get_job, is_running, run_job
+
+router = APIRouter(prefix="/admin/jobs", tags=["Jobs"])
+
+
+# -------------------------
+# JOB PROGRESS
+# -------------------------
+@router.get("/{job_id}")
+def get_job_status(job_id: str, user=Depends(verify_admin_token)):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job["active"] = is_running(job_id)
+    return job
+
+
+# -------------------------
+# RESUME FROM CHECKPOINT
+# -------------------------
+@router.post("/{job_id}/resume")
+def resume_job(job_id: str, background_tasks: BackgroundTasks, user=Depends(verify_admin_token)):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.get("status") == "completed":
+        return {"id": job_id, "status": "completed"}
+    if is_running(job_id):
+        return {"id": job_id, "status": "running"}
+
+    background_tasks.add_task(run_job, job_id)
+    return {"id": job_id, "status": "resuming", "cursor": job.get("cursor")}
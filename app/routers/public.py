@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Request, Response
+from app.services import site_bootstrap
+from app.services.http_cache import etag_matches
+
+router = APIRouter(prefix="/public", tags=["Public"])
+
+
+# -------------------------
+# SITE BOOTSTRAP (theme, homepage, info, promotions, pricing)
+# -------------------------
+@router.get("/bootstrap")
+def get_site_bootstrap(request: Request):
+    encoding = site_bootstrap.choose_encoding(request.headers.get("accept-encoding"))
+    etag, body = site_bootstrap.get_body(encoding)
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": site_bootstrap.CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field
 from typing import List, Optional
 from app.auth import verify_admin_token
 from app.services.firebase_setup import db
+from app.services.settings_store import settings_store
 
 router = APIRouter(prefix="/admin/settings", tags=["Admin Settings"])
 
@@ -33,17 +34,8 @@ class SiteSettings(BaseModel):
 @router.get("/all", response_model=SiteSettings)
 def get_all_settings(admin=Depends(verify_admin_token)):
     """Fetches the global site configuration from Firestore."""
-    try:
-        doc_ref = db.collection("settings").document("site_config")
-        doc = doc_ref.get()
-        
-        if doc.exists:
-            return doc.to_dict()
-        
-        # If no config exists, return the default model values
-        return SiteSettings().dict()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch settings: {str(e)}")
+    # If no config exists, return the default model values
+    return settings_store.get("settings", "site_config") or SiteSettings().dict()
 
 @router.put("/all")
 def update_all_settings(settings: SiteSettings, admin=Depends(verify_admin_token)):
@@ -52,6 +44,7 @@ def update_all_settings(settings: SiteSettings, admin=Depends(verify_admin_token
         doc_ref = db.collection("settings").document("site_config")
         # Save the validated data
         doc_ref.set(settings.dict(), merge=True)
+        settings_store.note_write("settings", "site_config", settings.dict())
         return {"status": "success", "message": "Site configuration published live."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database write failed: {str(e)}")
\ No newline at end of file
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from app.auth import verify_admin_token, hash_password, verify_password
 from app.services.firebase_setup import db
+from app.services.settings_store import settings_store
 
 router = APIRouter()
 
@@ -9,13 +10,11 @@ DEFAULT_ACCOUNT = {
     "enable2FA": False,
 }
 
+settings_store.register_defaults("settings", "admin_account", DEFAULT_ACCOUNT)
+
 @router.get("/account")
 def get_account(user=Depends(verify_admin_token)):
-    doc = db.collection("settings").document("admin_account").get()
-    if not doc.exists:
-        db.collection("settings").document("admin_account").set(DEFAULT_ACCOUNT)
-        return {"account": DEFAULT_ACCOUNT}
-    return {"account": doc.to_dict()}
+    return {"account": settings_store.get("settings", "admin_account")}
 
 @router.post("/account/update")
 def update_account(data: dict, user=Depends(verify_admin_token)):
@@ -32,11 +31,14 @@ def update_account(data: dict, user=Depends(verify_admin_token)):
         if data.get("newPassword"):
             new_hash = hash_password(data["newPassword"])
             doc_ref.set({"passwordHash": new_hash}, merge=True)
+            settings_store.note_write("settings", "admin_account", {"passwordHash": new_hash})
 
     # Update other fields
-    doc_ref.set({
+    account = {
         "email": data.get("email"),
         "enable2FA": data.get("enable2FA"),
-    }, merge=True)
+    }
+    doc_ref.set(account, merge=True)
+    settings_store.note_write("settings", "admin_account", account)
 
     return {"success": True}
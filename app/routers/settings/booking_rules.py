@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from app.auth import verify_admin_token
 from app.services.firebase_setup import db
+from app.services.settings_store import settings_store
 
 router = APIRouter()
 
@@ -20,26 +21,12 @@ DEFAULT_RULES = {
 # -------------------------------------------------
 # GET RULES
 # -------------------------------------------------
+settings_store.register_defaults("settings", "booking_rules", DEFAULT_RULES)
+
 @router.get("/booking-rules")
 def get_rules(user=Depends(verify_admin_token)):
-    try:
-        doc_ref = db.collection("settings").document("booking_rules")
-        doc = doc_ref.get()
-
-        if not doc.exists:
-            # Initialize Firestore with defaults
-            doc_ref.set(DEFAULT_RULES)
-            return DEFAULT_RULES
-        
-        # Merge defaults into existing data to catch any new rule fields added to code
-        data = doc.to_dict()
-        for key, val in DEFAULT_RULES.items():
-            if key not in data:
-                data[key] = val
-        
-        return data
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Rules Retrieval Error: {str(e)}")
+    # Defaults fill any new rule fields added to code
+    return settings_store.get("settings", "booking_rules")
 
 # -------------------------------------------------
 # UPDATE RULES
@@ -60,6 +47,7 @@ def update_rules(data: dict, user=Depends(verify_admin_token)):
 
     try:
         db.collection("settings").document("booking_rules").set(data, merge=True)
+        settings_store.note_write("settings", "booking_rules", data)
         return {"success": True, "message": "Booking rules updated."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Rules Update Error: {str(e)}")
\ No newline at end of file
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends
 from app.auth import verify_admin_token
 from app.services.firebase_setup import db
+from app.services.settings_store import settings_store
 
 router = APIRouter()
 
@@ -12,15 +13,14 @@ DEFAULT_INFO = {
     "hours": "",
 }
 
+settings_store.register_defaults("settings", "business_info", DEFAULT_INFO)
+
 @router.get("/business-info")
 def get_info(user=Depends(verify_admin_token)):
-    doc = db.collection("settings").document("business_info").get()
-    if not doc.exists:
-        db.collection("settings").document("business_info").set(DEFAULT_INFO)
-        return {"info": DEFAULT_INFO}
-    return {"info": doc.to_dict()}
+    return {"info": settings_store.get("settings", "business_info")}
 
 @router.post("/business-info/update")
 def update_info(data: dict, user=Depends(verify_admin_token)):
     db.collection("settings").document("business_info").set(data, merge=True)
+    settings_store.note_write("settings", "business_info", data)
     return {"success": True}
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from app.auth import verify_admin_token
 from app.services.firebase_setup import db
+from app.services.settings_store import settings_store
 
 router = APIRouter()
 
@@ -16,25 +17,19 @@ DEFAULT_HOMEPAGE = {
     "featuredItems": []
 }
 
+settings_store.register_defaults("settings", "homepage", DEFAULT_HOMEPAGE)
+
 @router.get("/homepage")
 def get_homepage(user=Depends(verify_admin_token)):
-    try:
-        doc = db.collection("settings").document("homepage").get()
-        if not doc.exists:
-            # Initialize Firestore with defaults if empty
-            db.collection("settings").document("homepage").set(DEFAULT_HOMEPAGE)
-            return DEFAULT_HOMEPAGE
-        
-        # Return the data directly to simplify frontend setPreviewData(res.data)
-        return doc.to_dict()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Return the data directly to simplify frontend setPreviewData(res.data)
+    return settings_store.get("settings", "homepage")
 
 @router.post("/homepage/update")
 def update_homepage(data: dict, user=Depends(verify_admin_token)):
     try:
         # merge=True protects any fields you might add later (like SEO tags)
         db.collection("settings").document("homepage").set(data, merge=True)
+        settings_store.note_write("settings", "homepage", data)
         return {"success": True, "updated_data": data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Firestore error: {str(e)}")
\ No newline at end of file
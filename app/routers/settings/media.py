@@ -1,52 +1,69 @@
-import uuid
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, Depends, HTTPException
 from app.auth import verify_admin_token
-from app.services.firebase_setup import db, bucket
-from google.cloud import firestore # Needed for ArrayUnion/Remove
+from app.services.jobs import create_job, run_job
+from app.services.media_pipeline import UploadTooLarge, media_blob_paths, process_upload, read_upload
+from app.services.media_library import (
+    MEDIA_PAGE_SIZE,
+    delete_blobs,
+    delete_entry,
+    find_by_hash,
+    legacy_entries,
+    list_entries,
+    save_entry,
+)
 
 router = APIRouter()
 
 @router.get("/media")
-def list_media(user=Depends(verify_admin_token)):
-    doc = db.collection("settings").document("media").get()
-    if not doc.exists:
-        return {"files": []}
-    return {"files": doc.to_dict().get("files", [])}
+def list_media(limit: int = MEDIA_PAGE_SIZE, cursor: str = None, user=Depends(verify_admin_token)):
+    try:
+        page = list_entries(limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Entries not yet moved out of settings/media lead the first page
+    if not cursor:
+        page["files"] = legacy_entries() + page["files"]
+    return page
 
 @router.post("/media/upload")
-def upload_media(file: UploadFile = File(...), user=Depends(verify_admin_token)):
+def upload_media(background_tasks: BackgroundTasks, file: UploadFile = File(...), user=Depends(verify_admin_token)):
+    try:
+        # Hashed while streaming; the hash is the media id
+        data, content_hash = read_upload(file.file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
     try:
-        file_id = str(uuid.uuid4())
-        # Path in Firebase Storage
-        blob = bucket.blob(f"media/{file_id}-{file.filename}")
-        blob.upload_from_file(file.file, content_type=file.content_type)
-        blob.make_public()
-
-        entry = {
-            "id": file_id,
-            "name": file.filename,
-            "url": blob.public_url,
-        }
-
-        # Use ArrayUnion to add only this file without fetching the whole list
-        doc_ref = db.collection("settings").document("media")
-        doc_ref.update({"files": firestore.ArrayUnion([entry])})
+        existing = find_by_hash(content_hash)
+        if existing:
+            return {"file": existing, "duplicate": True}
+
+        # Original plus WebP/AVIF variants and a blur placeholder
+        entry = process_upload(data, content_hash, file.filename, file.content_type)
+        stored, created = save_entry(entry)
+        if not created:
+            # Same content landed concurrently; drop any blob it doesn't use
+            extra = set(media_blob_paths(entry)) - set(media_blob_paths(stored))
+            background_tasks.add_task(delete_blobs, sorted(extra))
+            return {"file": stored, "duplicate": True}
 
         return {"file": entry}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/media/{file_id}")
-def delete_media(file_id: str, user=Depends(verify_admin_token)):
-    doc_ref = db.collection("settings").document("media")
-    data = doc_ref.get().to_dict() or {"files": []}
-    
-    # Find the specific object to remove (Firestore needs the whole object for ArrayRemove)
-    file_to_remove = next((f for f in data["files"] if f["id"] == file_id), None)
-    
-    if file_to_remove:
-        doc_ref.update({"files": firestore.ArrayRemove([file_to_remove])})
-        # Optional: You could also delete the actual file from bucket here
-        # bucket.blob(f"media/{file_id}-{file_to_remove['name']}").delete()
-
-    return {"success": True}
\ No newline at end of file
+def delete_media(file_id: str, background_tasks: BackgroundTasks, user=Depends(verify_admin_token)):
+    entry = delete_entry(file_id)
+    if entry:
+        # The original and every variant go after the response is sent
+        background_tasks.add_task(delete_blobs, media_blob_paths(entry), file_id)
+
+    return {"success": True}
+
+@router.post("/media/migrate")
+def migrate_media(background_tasks: BackgroundTasks, user=Depends(verify_admin_token)):
+    """Move settings/media entries into the media collection; poll GET /admin/jobs/{id}."""
+    job_id = create_job("media_migration", actor=(user or {}).get("email"))
+    background_tasks.add_task(run_job, job_id)
+    return {"jobId": job_id, "status": "queued", "progressUrl": f"/admin/jobs/{job_id}"}
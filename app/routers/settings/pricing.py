@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from app.auth import verify_admin_token
 from app.services.firebase_setup import db
+from app.services.settings_store import settings_store
 
 router = APIRouter()
 
@@ -38,44 +39,15 @@ DEFAULT_PRICING = {
     }
 }
 
+settings_store.register_defaults("settings", "pricing", DEFAULT_PRICING)
+
 # -------------------------------------------------
-# GET PRICING — WITH AUTO‑REPAIR
+# GET PRICING
 # -------------------------------------------------
 @router.get("/pricing")
 def get_pricing(user=Depends(verify_admin_token)):
-    try:
-        doc_ref = db.collection("settings").document("pricing")
-        doc = doc_ref.get()
-
-        # Load existing data or start fresh
-        data = doc.to_dict() if doc.exists else None
-
-        # Rebuild full structure if the document is missing or corrupted
-        if not data or "items" not in data or not isinstance(data.get("items"), dict):
-            doc_ref.set(DEFAULT_PRICING)
-            return {"pricing": DEFAULT_PRICING}
-
-        repaired = False
-
-        # Check for missing top-level keys (taxRate, deliveryFee, etc.)
-        for key, value in DEFAULT_PRICING.items():
-            if key not in data:
-                data[key] = value
-                repaired = True
-
-        # Check for missing individual inflatables/add-ons
-        for item_key, item_value in DEFAULT_PRICING["items"].items():
-            if item_key not in data["items"]:
-                data["items"][item_key] = item_value
-                repaired = True
-
-        # If we had to fix anything, update the database silently
-        if repaired:
-            doc_ref.set(data)
-
-        return {"pricing": data}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Pricing Retrieval Error: {str(e)}")
+    # Missing keys and items are filled from DEFAULT_PRICING in memory.
+    return {"pricing": settings_store.get("settings", "pricing")}
 
 # -------------------------------------------------
 # UPDATE PRICING
@@ -91,6 +63,7 @@ def update_pricing(data: dict, user=Depends(verify_admin_token)):
 
     try:
         db.collection("settings").document("pricing").set(data, merge=True)
+        settings_store.note_write("settings", "pricing", data)
         return {"success": True, "message": "Pricing structure updated."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Pricing Update Error: {str(e)}")
\ No newline at end of file
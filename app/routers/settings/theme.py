@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from app.auth import verify_admin_token
 from app.services.firebase_setup import db
+from app.services.settings_store import settings_store
 
 router = APIRouter()
 
@@ -15,23 +16,18 @@ DEFAULT_THEME = {
     "radius": 12,
 }
 
+settings_store.register_defaults("settings", "theme", DEFAULT_THEME)
+
 @router.get("/theme")
 def get_theme(user=Depends(verify_admin_token)):
-    try:
-        doc = db.collection("settings").document("theme").get()
-        if not doc.exists:
-            # Initialize with defaults if empty
-            db.collection("settings").document("theme").set(DEFAULT_THEME)
-            return DEFAULT_THEME
-        return doc.to_dict()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return settings_store.get("settings", "theme")
 
 @router.post("/theme/update")
 def update_theme(data: dict, user=Depends(verify_admin_token)):
     try:
         # merge=True prevents overwriting fields if you add more later
         db.collection("settings").document("theme").set(data, merge=True)
+        settings_store.note_write("settings", "theme", data)
         return {"success": True, "updated_data": data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Firestore error: {str(e)}")
\ No newline at end of file
@@ -1,9 +1,15 @@
 from fastapi import APIRouter
 from app.triggers.on_balance_reminder import process_upcoming_balances
+from app.services.email_outbox import drain_outbox
 
 router = APIRouter(prefix="/tasks", tags=["Automation"])
 
 @router.get("/run-balance-reminders")
-async def trigger_reminders():
+def trigger_reminders():
     # This is what the cron job hits
-    return process_upcoming_balances()
\ No newline at end of file
+    return process_upcoming_balances()
+
+@router.get("/drain-email-outbox")
+def trigger_outbox_drain():
+    # Cron fallback for the in-process outbox worker
+    return drain_outbox()
@@ -1,42 +1,74 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
 import os
-import requests
+
+import httpx
+from fastapi import APIRouter, HTTPException
+from app.services.distance_service import DistanceLookupError, get_distance_miles
+from app.services.distance_estimate import estimate_miles
 
 router = APIRouter(prefix="/utils", tags=["Utils"])
 
+# Past this budget the cart gets an offline estimate instead of waiting.
+DISTANCE_LATENCY_BUDGET_SECONDS = float(os.getenv("DISTANCE_LATENCY_BUDGET", "2.5"))
+
+# Google statuses that mean "try again later" rather than "bad address".
+FALLBACK_STATUSES = ("OVER_QUERY_LIMIT", "OVER_DAILY_LIMIT", "UNKNOWN_ERROR")
+
+
+def _estimated_response(origin: str, destination: str, reason: str):
+    miles = estimate_miles(origin, destination)
+    if miles is None:
+        return None
+    print(f"Distance estimate used ({reason}): {destination}")
+    return {"distance": miles, "estimated": True, "reason": reason}
+
+
+def _log_background_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception():
+        print(f"Background distance lookup failed: {task.exception()}")
+
+
 @router.post("/distance/")
 async def get_distance(data: dict):
     origin = data.get("origin")
     destination = data.get("destination")
-    api_key = os.getenv("GOOGLE_MAPS_API_KEY")
 
     if not origin or not destination:
         raise HTTPException(status_code=400, detail="Missing origin or destination")
 
-    # Call Google Distance Matrix API
-    url = (
-        f"https://maps.googleapis.com/maps/api/distancematrix/json?"
-        f"origins={origin}&destinations={destination}&units=imperial&key={api_key}"
-    )
-    
+    # Shared cache: memory -> Firestore distance_cache -> Google Distance Matrix.
+    # The lookup keeps running past the budget so its exact result lands in the
+    # cache and replaces the estimate on the next request.
+    lookup = asyncio.ensure_future(get_distance_miles(origin, destination))
     try:
-        response = requests.get(url)
-        res_data = response.json()
-
-        if res_data.get("status") == "OK":
-            element = res_data["rows"][0]["elements"][0]
-            if element.get("status") == "OK":
-                # distance.value is in meters; convert to miles
-                meters = element["distance"]["value"]
-                miles = meters * 0.000621371
-                return {"distance": miles}
-            else:
-                raise HTTPException(status_code=400, detail=f"Google Element Error: {element.get('status')}")
-        
-        raise HTTPException(status_code=400, detail="Google API Error: " + res_data.get("status", "Unknown"))
-        
-    except HTTPException as he:
-        raise he    
-            
+        miles = await asyncio.wait_for(asyncio.shield(lookup), timeout=DISTANCE_LATENCY_BUDGET_SECONDS)
+        return {"distance": miles, "estimated": False}
+
+    except asyncio.TimeoutError:
+        lookup.add_done_callback(_log_background_failure)
+        estimate = _estimated_response(origin, destination, "timeout")
+        if estimate:
+            return estimate
+        try:
+            miles = await lookup
+        except DistanceLookupError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        return {"distance": miles, "estimated": False}
+
+    except DistanceLookupError as e:
+        if any(status in str(e) for status in FALLBACK_STATUSES):
+            estimate = _estimated_response(origin, destination, "google_unavailable")
+            if estimate:
+                return estimate
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except httpx.HTTPError as e:
+        estimate = _estimated_response(origin, destination, "google_unavailable")
+        if estimate:
+            return estimate
+        raise HTTPException(status_code=500, detail=str(e))
+
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
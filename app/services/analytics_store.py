@@ -0,0 +1,315 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import date, datetime
+
+from app.automation.lifecycle import normalize_date
+from app.services.firebase_setup import db
+
+# Local columnar snapshot of the bookings collection. SQLite ships with
+# Python, so reporting never needs another service or dependency.
+ANALYTICS_DB_PATH = os.getenv("ANALYTICS_DB_PATH", "analytics.sqlite3")
+
+# How long a snapshot is considered fresh before a read triggers a resync.
+SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv("ANALYTICS_SNAPSHOT_MAX_AGE", "300"))
+
+# Payment states that represent a real, committed booking.
+BOOKED_PAYMENT_STATUSES = ("deposit_paid", "balance_paid", "confirmed")
+
+SNAPSHOT_FIELDS = [
+    "date", "eventDate", "status", "paymentStatus", "setupType", "mode",
+    "items", "pricing_breakdown", "total", "deposit", "remaining",
+    "mileageFee", "distance", "created_at", "createdAt",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    id TEXT PRIMARY KEY,
+    event_date TEXT,
+    event_month TEXT,
+    created_date TEXT,
+    lead_days INTEGER,
+    status TEXT,
+    payment_status TEXT,
+    setup_type TEXT,
+    subtotal REAL,
+    referral_discount REAL,
+    promo_discount REAL,
+    waiver REAL,
+    tax REAL,
+    total REAL,
+    deposit REAL,
+    remaining REAL,
+    mileage_fee REAL,
+    distance REAL,
+    item_count INTEGER,
+    update_time TEXT
+);
+CREATE TABLE IF NOT EXISTS booking_items (
+    booking_id TEXT,
+    event_date TEXT,
+    title TEXT,
+    mode TEXT,
+    price REAL
+);
+CREATE INDEX IF NOT EXISTS idx_bookings_month ON bookings(event_month);
+CREATE INDEX IF NOT EXISTS idx_items_booking ON booking_items(booking_id);
+CREATE INDEX IF NOT EXISTS idx_items_date ON booking_items(event_date);
+CREATE TABLE IF NOT EXISTS snapshot_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_sync_lock = threading.Lock()
+_last_sync = 0.0
+
+
+def _connect():
+    conn = sqlite3.connect(ANALYTICS_DB_PATH)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _created_date(data: dict):
+    """Return the booking creation date as YYYY-MM-DD from either field."""
+    raw = data.get("created_at") or data.get("createdAt")
+    if isinstance(raw, datetime):
+        return raw.date().isoformat()
+    if raw:
+        return normalize_date(raw)
+    return None
+
+
+def _lead_days(event_date, created_date):
+    try:
+        event = date.fromisoformat(event_date)
+        created = date.fromisoformat(created_date)
+    except (TypeError, ValueError):
+        return None
+    return (event - created).days
+
+
+# -----------------------------
+# ROW FLATTENING
+# -----------------------------
+def flatten_booking(doc_id: str, data: dict):
+    """Turn a Firestore booking into one typed row plus one row per item."""
+    pricing = data.get("pricing_breakdown") or {}
+    event_date = normalize_date(data.get("date") or data.get("eventDate"))
+    created_date = _created_date(data)
+    items = [i for i in (data.get("items") or []) if isinstance(i, dict)]
+
+    row = {
+        "id": doc_id,
+        "event_date": event_date,
+        "event_month": event_date[:7] if event_date else None,
+        "created_date": created_date,
+        "lead_days": _lead_days(event_date, created_date),
+        "status": str(data.get("status") or "").lower(),
+        "payment_status": str(data.get("paymentStatus") or "").lower(),
+        "setup_type": str(data.get("setupType") or data.get("mode") or "").lower() or None,
+        "subtotal": _to_float(pricing.get("subtotal")),
+        "referral_discount": _to_float(pricing.get("referral_discount")),
+        "promo_discount": _to_float(pricing.get("promo_discount")),
+        "waiver": _to_float(pricing.get("waiver")),
+        "tax": _to_float(pricing.get("tax")),
+        "total": _to_float(pricing.get("total") or data.get("total")),
+        "deposit": _to_float(pricing.get("deposit") or data.get("deposit")),
+        "remaining": _to_float(pricing.get("remaining") or data.get("remaining")),
+        "mileage_fee": _to_float(data.get("mileageFee")),
+        "distance": _to_float(data.get("distance")),
+        "item_count": len(items),
+    }
+
+    item_rows = [
+        (
+            doc_id,
+            event_date,
+            item.get("title") or item.get("name") or "Unknown Item",
+            str(item.get("mode") or "").lower() or None,
+            _to_float(item.get("price")),
+        )
+        for item in items
+    ]
+    return row, item_rows
+
+
+# -----------------------------
+# INCREMENTAL SNAPSHOT
+# -----------------------------
+def sync_snapshot(force: bool = False) -> dict:
+    """
+    Bring the local snapshot up to date with Firestore.
+
+    Only the reporting fields are projected, and only documents whose
+    Firestore update_time changed since the last sync are rewritten.
+    """
+    global _last_sync
+
+    with _sync_lock:
+        if not force and time.time() - _last_sync < SNAPSHOT_MAX_AGE_SECONDS:
+            return {"status": "fresh"}
+
+        with closing(_connect()) as conn:
+            known = {
+                row["id"]: row["update_time"]
+                for row in conn.execute("SELECT id, update_time FROM bookings")
+            }
+
+            seen = set()
+            changed = 0
+            docs = db.collection("bookings").select(SNAPSHOT_FIELDS).stream()
+            for doc in docs:
+                seen.add(doc.id)
+                update_time = str(doc.update_time) if doc.update_time else ""
+                if known.get(doc.id) == update_time and update_time:
+                    continue
+
+                row, item_rows = flatten_booking(doc.id, doc.to_dict() or {})
+                row["update_time"] = update_time
+                columns = ", ".join(row)
+                placeholders = ", ".join(f":{key}" for key in row)
+                conn.execute(
+                    f"INSERT OR REPLACE INTO bookings ({columns}) VALUES ({placeholders})",
+                    row,
+                )
+                conn.execute("DELETE FROM booking_items WHERE booking_id = ?", (doc.id,))
+                conn.executemany(
+                    "INSERT INTO booking_items (booking_id, event_date, title, mode, price) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    item_rows,
+                )
+                changed += 1
+
+            removed = [(doc_id,) for doc_id in known if doc_id not in seen]
+            conn.executemany("DELETE FROM bookings WHERE id = ?", removed)
+            conn.executemany("DELETE FROM booking_items WHERE booking_id = ?", removed)
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshot_meta (key, value) VALUES ('synced_at', ?)",
+                (datetime.utcnow().isoformat(),),
+            )
+            conn.commit()
+
+        _last_sync = time.time()
+        return {"status": "synced", "changed": changed, "removed": len(removed), "total": len(seen)}
+
+
+def _query(sql: str, params=()):
+    sync_snapshot()
+    with closing(_connect()) as conn:
+        return [dict(row) for row in conn.execute(sql, params)]
+
+
+def _booked_clause(alias: str = "b") -> str:
+    statuses = ", ".join(f"'{s}'" for s in BOOKED_PAYMENT_STATUSES)
+    return f"{alias}.payment_status IN ({statuses}) AND {alias}.status NOT IN ('canceled', 'cancelled')"
+
+
+# -----------------------------
+# AGGREGATIONS
+# -----------------------------
+def revenue_by_month(start: str = None, end: str = None):
+    return _query(
+        f"""
+        SELECT b.event_month AS month,
+               COUNT(*) AS bookings,
+               ROUND(SUM(b.total), 2) AS revenue,
+               ROUND(SUM(b.subtotal), 2) AS equipment,
+               ROUND(SUM(b.waiver), 2) AS waiver,
+               ROUND(SUM(b.tax), 2) AS tax,
+               ROUND(SUM(b.mileage_fee), 2) AS mileage,
+               ROUND(SUM(b.referral_discount + b.promo_discount), 2) AS discounts
+        FROM bookings b
+        WHERE {_booked_clause()}
+          AND b.event_month IS NOT NULL
+          AND (:start IS NULL OR b.event_date >= :start)
+          AND (:end IS NULL OR b.event_date <= :end)
+        GROUP BY b.event_month
+        ORDER BY b.event_month
+        """,
+        {"start": start, "end": end},
+    )
+
+
+def item_utilization(start: str, end: str):
+    """Booked days and revenue per item, as a share of days in the range."""
+    days_in_range = (date.fromisoformat(end) - date.fromisoformat(start)).days + 1
+    rows = _query(
+        f"""
+        SELECT i.title AS item,
+               COUNT(DISTINCT i.event_date) AS booked_days,
+               COUNT(*) AS rentals,
+               ROUND(SUM(i.price), 2) AS revenue
+        FROM booking_items i
+        JOIN bookings b ON b.id = i.booking_id
+        WHERE {_booked_clause()}
+          AND i.event_date BETWEEN :start AND :end
+        GROUP BY i.title
+        ORDER BY revenue DESC
+        """,
+        {"start": start, "end": end},
+    )
+    for row in rows:
+        row["utilization"] = round(row["booked_days"] / days_in_range, 4) if days_in_range > 0 else 0
+    return {"daysInRange": days_in_range, "items": rows}
+
+
+def average_lead_time(start: str = None, end: str = None):
+    rows = _query(
+        f"""
+        SELECT b.event_month AS month,
+               COUNT(b.lead_days) AS bookings,
+               ROUND(AVG(b.lead_days), 1) AS avg_lead_days,
+               MIN(b.lead_days) AS min_lead_days,
+               MAX(b.lead_days) AS max_lead_days
+        FROM bookings b
+        WHERE {_booked_clause()}
+          AND b.lead_days IS NOT NULL AND b.lead_days >= 0
+          AND (:start IS NULL OR b.event_date >= :start)
+          AND (:end IS NULL OR b.event_date <= :end)
+        GROUP BY b.event_month
+        ORDER BY b.event_month
+        """,
+        {"start": start, "end": end},
+    )
+    overall = _query(
+        f"""
+        SELECT ROUND(AVG(b.lead_days), 1) AS avg_lead_days, COUNT(b.lead_days) AS bookings
+        FROM bookings b
+        WHERE {_booked_clause()}
+          AND b.lead_days IS NOT NULL AND b.lead_days >= 0
+          AND (:start IS NULL OR b.event_date >= :start)
+          AND (:end IS NULL OR b.event_date <= :end)
+        """,
+        {"start": start, "end": end},
+    )
+    return {"overall": overall[0] if overall else {}, "byMonth": rows}
+
+
+def wet_dry_mix(start: str = None, end: str = None):
+    return _query(
+        f"""
+        SELECT COALESCE(i.mode, 'unspecified') AS mode,
+               COUNT(*) AS rentals,
+               ROUND(SUM(i.price), 2) AS revenue
+        FROM booking_items i
+        JOIN bookings b ON b.id = i.booking_id
+        WHERE {_booked_clause()}
+          AND (:start IS NULL OR i.event_date >= :start)
+          AND (:end IS NULL OR i.event_date <= :end)
+        GROUP BY COALESCE(i.mode, 'unspecified')
+        ORDER BY rentals DESC
+        """,
+        {"start": start, "end": end},
+    )
@@ -0,0 +1,115 @@
+import csv
+import io
+import json
+import zlib
+
+from app.services.firebase_setup import db
+
+EXPORT_PAGE_SIZE = 200
+
+PRICING_KEYS = [
+    "subtotal", "referral_discount", "promo_discount", "waiver",
+    "tax", "total", "deposit", "remaining",
+]
+
+DEFAULT_EXPORT_FIELDS = [
+    "id", "name", "email", "phone", "date", "deliveryTime", "pickupTime",
+    "address", "status", "paymentStatus", "setupType", "distance",
+    "mileageFee", "itemCount", "itemTitles", "itemModes", "itemPrices",
+] + [f"pricing_{key}" for key in PRICING_KEYS] + ["created_at"]
+
+
+def flatten_booking_row(doc_id: str, data: dict) -> dict:
+    """Flatten pricing_breakdown and items into scalar export columns."""
+    row = {"id": doc_id}
+    for key, value in data.items():
+        if key in ("pricing_breakdown", "items", "history"):
+            continue
+        if isinstance(value, (dict, list)):
+            row[key] = json.dumps(value, default=str)
+        else:
+            row[key] = value
+
+    row["name"] = data.get("name") or data.get("customer_name")
+    row["date"] = data.get("date") or data.get("eventDate")
+
+    pricing = data.get("pricing_breakdown") or {}
+    for key, value in pricing.items():
+        row[f"pricing_{key}"] = value
+
+    items = [i for i in (data.get("items") or []) if isinstance(i, dict)]
+    row["itemCount"] = len(items)
+    row["itemTitles"] = "; ".join(str(i.get("title") or i.get("name") or "") for i in items)
+    row["itemModes"] = "; ".join(str(i.get("mode") or "") for i in items)
+    row["itemPrices"] = "; ".join(str(i.get("price") or 0) for i in items)
+    return row
+
+
+def _booking_date(data: dict):
+    return data.get("date") or data.get("eventDate")
+
+
+def _in_range(data: dict, date_from: str = None, date_to: str = None) -> bool:
+    if not date_from and not date_to:
+        return True
+    date = _booking_date(data)
+    if not date:
+        return False
+    date = str(date)
+    return (not date_from or date >= date_from) and (not date_to or date <= date_to)
+
+
+def iter_booking_pages(date_from: str = None, date_to: str = None):
+    """
+    Yield bookings page by page using a start_after cursor on the document
+    id. Ordering by "date" would silently drop bookings without that field
+    (older ones only carry eventDate), so the range is applied per page.
+    """
+    query = db.collection("bookings").order_by("__name__").limit(EXPORT_PAGE_SIZE)
+
+    last_doc = None
+    while True:
+        page_query = query.start_after(last_doc) if last_doc else query
+        page = list(page_query.stream())
+        if not page:
+            return
+        matching = [doc for doc in page if _in_range(doc.to_dict() or {}, date_from, date_to)]
+        if matching:
+            yield matching
+        if len(page) < EXPORT_PAGE_SIZE:
+            return
+        last_doc = page[-1]
+
+
+def iter_csv(fields: list, date_from: str = None, date_to: str = None):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for page in iter_booking_pages(date_from, date_to):
+        for doc in page:
+            writer.writerow(flatten_booking_row(doc.id, doc.to_dict() or {}))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    tail = buffer.getvalue()
+    if tail:
+        yield tail.encode("utf-8")
+
+
+def iter_ndjson(fields: list, date_from: str = None, date_to: str = None):
+    for page in iter_booking_pages(date_from, date_to):
+        lines = []
+        for doc in page:
+            row = flatten_booking_row(doc.id, doc.to_dict() or {})
+            lines.append(json.dumps({f: row.get(f) for f in fields}, default=str))
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def gzip_stream(chunks):
+    """Compress an iterator of byte chunks on the fly."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,52 @@
+from google.cloud import firestore
+
+from app.services.firebase_setup import db
+
+HISTORY_SUBCOLLECTION = "history"
+HISTORY_PAGE_SIZE = 25
+HISTORY_MAX_PAGE_SIZE = 100
+
+
+def history_collection(booking_id: str):
+    return db.collection("bookings").document(booking_id).collection(HISTORY_SUBCOLLECTION)
+
+
+def add_history_entry(writer, booking_id: str, entry: dict):
+    """
+    Queue a history entry on a batch or BulkWriter so it lands with the
+    booking update instead of growing the booking document itself.
+    """
+    ref = history_collection(booking_id).document()
+    writer.set(ref, {**entry, "timestamp": firestore.SERVER_TIMESTAMP})
+    return ref
+
+
+def delete_history(writer, booking_id: str) -> int:
+    """Queue deletes for every history entry of a booking on a batch or BulkWriter."""
+    count = 0
+    for doc in history_collection(booking_id).select([]).stream():
+        writer.delete(doc.reference)
+        count += 1
+    return count
+
+
+def list_history(booking_id: str, limit: int = HISTORY_PAGE_SIZE, cursor: str = None) -> dict:
+    """Return one page of history entries, newest first."""
+    limit = max(1, min(int(limit), HISTORY_MAX_PAGE_SIZE))
+    col = history_collection(booking_id)
+    query = col.order_by("timestamp", direction=firestore.Query.DESCENDING).limit(limit)
+
+    if cursor:
+        cursor_doc = col.document(cursor).get()
+        if not cursor_doc.exists:
+            raise ValueError("Invalid history cursor")
+        query = query.start_after(cursor_doc)
+
+    entries = []
+    for doc in query.stream():
+        entry = doc.to_dict() or {}
+        entry["id"] = doc.id
+        entries.append(entry)
+
+    next_cursor = entries[-1]["id"] if len(entries) == limit else None
+    return {"entries": entries, "nextCursor": next_cursor}
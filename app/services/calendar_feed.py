@@ -0,0 +1,184 @@
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, time as dt_time, timedelta, timezone
+
+import pytz
+
+from app.automation.lifecycle import normalize_date
+from app.services.firebase_setup import db
+
+# iCalendar subscription feed of upcoming bookings. Each VEVENT is rendered
+# once per booking version (the document's update_time) and the feed is the
+# concatenation of cached events, so an unchanged poll re-renders nothing.
+# The business is in Silver Creek, GA (Eastern). Google Calendar event times
+# (build_event_times) use the same zone.
+BUSINESS_TIMEZONE = pytz.timezone(os.getenv("BUSINESS_TIMEZONE", "America/New_York"))
+FEED_REFRESH_SECONDS = int(os.getenv("CALENDAR_FEED_REFRESH_SECONDS", "60"))
+DEFAULT_DELIVERY_TIME = dt_time(10, 0)
+DEFAULT_PICKUP_TIME = dt_time(18, 0)
+TIME_FORMATS = ("%I:%M %p", "%I:%M%p", "%I %p", "%I%p", "%H:%M")
+
+FEED_FIELDS = [
+    "name", "customer_name", "email", "phone", "date", "eventDate",
+    "deliveryTime", "pickupTime", "overnight", "address", "location",
+    "items", "status", "paymentStatus", "remaining", "pricing_breakdown",
+]
+
+CALENDAR_HEADER = [
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "PRODID:-//Buzzys Entertainment//Bookings Feed//EN",
+    "CALSCALE:GREGORIAN",
+    "METHOD:PUBLISH",
+    "X-WR-CALNAME:Buzzy's Bookings",
+]
+CALENDAR_FOOTER = ["END:VCALENDAR"]
+
+_events = {}  # booking id -> (version, rendered VEVENT)
+_feed = {"etag": None, "body": None, "checkedAt": 0.0}
+_lock = threading.Lock()
+
+
+# -----------------------------
+# RENDERING
+# -----------------------------
+def _escape(value) -> str:
+    text = str(value if value is not None else "")
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    """Fold content lines at 75 octets as RFC 5545 requires."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+    parts = []
+    while len(encoded) > 75:
+        cut = 75 if not parts else 74
+        # Never split inside a multi-byte character.
+        while cut and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+    parts.append(encoded.decode("utf-8"))
+    return "\r\n ".join(parts)
+
+
+def parse_time(raw, default: dt_time) -> dt_time:
+    text = str(raw or "").strip().upper()
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).time()
+        except ValueError:
+            continue
+    return default
+
+
+def event_window(booking: dict, event_date: str):
+    """Delivery and pickup as UTC datetimes, from local business times."""
+    day = datetime.strptime(event_date, "%Y-%m-%d").date()
+    start_time = parse_time(booking.get("deliveryTime"), DEFAULT_DELIVERY_TIME)
+    end_time = parse_time(booking.get("pickupTime"), DEFAULT_PICKUP_TIME)
+
+    start = BUSINESS_TIMEZONE.localize(datetime.combine(day, start_time))
+    end_day = day + timedelta(days=1) if booking.get("overnight") else day
+    end = BUSINESS_TIMEZONE.localize(datetime.combine(end_day, end_time))
+    if end <= start:
+        end += timedelta(days=1)
+    return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+
+
+def _utc_stamp(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def render_vevent(booking_id: str, booking: dict, event_date: str, updated_at: datetime) -> str:
+    start, end = event_window(booking, event_date)
+    name = booking.get("name") or booking.get("customer_name") or "Customer"
+    pricing = booking.get("pricing_breakdown") or {}
+    remaining = pricing.get("remaining") or booking.get("remaining") or 0
+    items = [i.get("title") for i in booking.get("items") or [] if isinstance(i, dict) and i.get("title")]
+
+    description = "\n".join([
+        "Items: " + (", ".join(items) or "None"),
+        f"Remaining balance: ${remaining}",
+        f"Payment: {booking.get('paymentStatus') or 'pending'}",
+        f"Phone: {booking.get('phone') or ''}",
+        f"Email: {booking.get('email') or ''}",
+    ])
+    status = str(booking.get("status") or "").lower()
+
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{booking_id}@buzzys.org",
+        f"DTSTAMP:{_utc_stamp(updated_at)}",
+        f"LAST-MODIFIED:{_utc_stamp(updated_at)}",
+        f"DTSTART:{_utc_stamp(start)}",
+        f"DTEND:{_utc_stamp(end)}",
+        f"SUMMARY:{_escape(f'Buzzy’s Booking – {name}')}",
+        f"LOCATION:{_escape(booking.get('address') or booking.get('location') or 'TBD')}",
+        f"DESCRIPTION:{_escape(description)}",
+        f"STATUS:{'CANCELLED' if status in ('canceled', 'cancelled') else 'CONFIRMED'}",
+        "END:VEVENT",
+    ]
+    return "\r\n".join(_fold(line) for line in lines)
+
+
+# -----------------------------
+# FEED
+# -----------------------------
+def _refresh():
+    today = datetime.now(BUSINESS_TIMEZONE).strftime("%Y-%m-%d")
+    docs = db.collection("bookings").select(FEED_FIELDS).stream()
+
+    seen = {}
+    for doc in docs:
+        booking = doc.to_dict() or {}
+        # Older bookings use eventDate and non-canonical formats, so the
+        # upcoming filter runs here rather than as a string range query.
+        event_date = normalize_date(booking.get("date") or booking.get("eventDate"))
+        if not event_date or event_date < today:
+            continue
+
+        version = doc.update_time.isoformat() if doc.update_time else ""
+        cached = _events.get(doc.id)
+        if cached is None or cached[0] != version:
+            try:
+                rendered = render_vevent(doc.id, booking, event_date, doc.update_time or datetime.now(timezone.utc))
+            except ValueError as exc:
+                print(f"CALENDAR FEED: skipping {doc.id}: {exc}")
+                continue
+            cached = (version, rendered)
+            _events[doc.id] = cached
+        seen[doc.id] = (event_date, cached)
+
+    # Forget past and deleted bookings.
+    for booking_id in list(_events):
+        if booking_id not in seen:
+            del _events[booking_id]
+
+    ordered = sorted(seen.items(), key=lambda kv: (kv[1][0], kv[0]))
+    fingerprint = "\n".join(f"{booking_id}:{cached[0]}" for booking_id, (_, cached) in ordered)
+    etag = '"' + hashlib.sha1(fingerprint.encode("utf-8")).hexdigest() + '"'
+
+    if etag != _feed["etag"]:
+        body = "\r\n".join(CALENDAR_HEADER + [cached[1] for _, (_, cached) in ordered] + CALENDAR_FOOTER) + "\r\n"
+        _feed["etag"] = etag
+        _feed["body"] = body.encode("utf-8")
+    _feed["checkedAt"] = time.monotonic()
+
+
+def get_feed():
+    """Return (etag, body bytes); Firestore is scanned at most once per refresh window."""
+    with _lock:
+        if _feed["body"] is None or time.monotonic() - _feed["checkedAt"] >= FEED_REFRESH_SECONDS:
+            _refresh()
+        return _feed["etag"], _feed["body"]
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import threading
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from google.cloud import firestore
+
+from app.routers.google_calendar import build_event_body, event_hash, update_booking_event
+from app.services.firebase_setup import db
+from app.services.rate_limit import TokenBucket
+
+# Admin edits enqueue the booking id here; the worker waits until edits to a
+# booking have been quiet for DEBOUNCE_SECONDS (but never longer than
+# MAX_DELAY_SECONDS) and then pushes the event once. The queue is in memory,
+# so anything lost on restart is picked up by the calendar reconciliation job.
+CALENDAR_FIELDS = {
+    "name", "address", "items", "total", "phone", "email", "status",
+    "paymentStatus", "date", "eventDate", "deliveryTime", "pickupTime", "overnight",
+}
+DEBOUNCE_SECONDS = float(os.getenv("CALENDAR_PUSH_DEBOUNCE_SECONDS", "10"))
+MAX_DELAY_SECONDS = 60
+POLL_SECONDS = 1
+PUSH_CONCURRENCY = 4
+CALENDAR_RATE_PER_SECOND = 5
+
+_pending = {}  # booking id -> (first enqueued, due)
+_lock = threading.Lock()
+_bucket = TokenBucket(CALENDAR_RATE_PER_SECOND, PUSH_CONCURRENCY)
+
+
+def enqueue_calendar_push(booking_id: str, changed_fields=None) -> bool:
+    """Schedule a push unless the edit touched no calendar-relevant field."""
+    if changed_fields is not None and not CALENDAR_FIELDS.intersection(changed_fields):
+        return False
+    now = time.monotonic()
+    with _lock:
+        first, _ = _pending.get(booking_id, (now, now))
+        _pending[booking_id] = (first, min(now + DEBOUNCE_SECONDS, first + MAX_DELAY_SECONDS))
+    return True
+
+
+def _take_due() -> list:
+    now = time.monotonic()
+    with _lock:
+        due = [booking_id for booking_id, (_, due_at) in _pending.items() if due_at <= now]
+        for booking_id in due:
+            del _pending[booking_id]
+    return due
+
+
+def push_booking(booking_id: str) -> str:
+    doc = db.collection("bookings").document(booking_id).get()
+    if not doc.exists:
+        return "missing"
+    booking = doc.to_dict() or {}
+    event_id = booking.get("google_event_id")
+    if not event_id:
+        # Events are created with the deposit; nothing to update yet.
+        return "no_event"
+
+    content_hash = event_hash(build_event_body(booking))
+    if content_hash == booking.get("google_event_hash"):
+        return "unchanged"
+
+    _bucket.acquire()
+    update_booking_event(event_id, booking)
+    doc.reference.update({
+        "google_event_hash": content_hash,
+        "google_event_synced_at": firestore.SERVER_TIMESTAMP,
+    })
+    return "updated"
+
+
+async def calendar_push_worker():
+    semaphore = asyncio.Semaphore(PUSH_CONCURRENCY)
+
+    async def push(booking_id):
+        async with semaphore:
+            try:
+                await run_in_threadpool(push_booking, booking_id)
+            except Exception as exc:
+                # Left stale; the reconciliation job retries it.
+                print(f"CALENDAR PUSH failed for {booking_id}: {exc}")
+
+    while True:
+        try:
+            await asyncio.sleep(POLL_SECONDS)
+            due = _take_due()
+            if due:
+                await asyncio.gather(*(push(booking_id) for booking_id in due))
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            print(f"CALENDAR PUSH worker error: {exc}")
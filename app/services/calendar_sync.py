@@ -0,0 +1,149 @@
+from datetime import datetime
+
+from google.cloud import firestore
+
+from app.automation.lifecycle import normalize_date
+from app.routers.google_calendar import (
+    CALENDAR_ID,
+    MAX_BATCH_REQUESTS,
+    build_event_body,
+    event_hash,
+    execute_batch,
+    get_calendar_service,
+)
+from app.services.calendar_feed import BUSINESS_TIMEZONE
+from app.services.firebase_setup import db
+from app.services.jobs import register_job
+
+# Bookings get a calendar event once the deposit lands. The reconciliation
+# job finds paid, upcoming bookings whose event is missing or whose stored
+# content hash no longer matches, and fixes them through the batch endpoint.
+# Manual in-person bookings are "confirmed" and never pass through Stripe,
+# so this job is what gives them their event.
+SYNC_PAYMENT_STATUSES = ["deposit_paid", "balance_paid", "confirmed"]
+SYNC_PAGE_SIZE = 200
+SYNC_FIELDS = [
+    "name", "address", "items", "total", "phone", "email", "status",
+    "paymentStatus", "date", "eventDate", "deliveryTime", "pickupTime",
+    "overnight", "google_event_id", "google_event_hash",
+]
+
+
+def plan_sync(booking: dict):
+    """Return (action, event body, hash); action is None when already in sync."""
+    body = build_event_body(booking)
+    content_hash = event_hash(body)
+    if not booking.get("google_event_id"):
+        return "insert", body, content_hash
+    if booking.get("google_event_hash") != content_hash:
+        return "update", body, content_hash
+    return None, body, content_hash
+
+
+def _run_requests(planned: dict) -> dict:
+    """
+    planned: {booking_id: (action, event_id, body)}. Sends them in batches
+    of MAX_BATCH_REQUESTS and returns {booking_id: (event or None, error)}.
+    """
+    events = get_calendar_service().events()
+    requests = []
+    for booking_id, (action, event_id, body) in planned.items():
+        if action == "insert":
+            request = events.insert(calendarId=CALENDAR_ID, body=body)
+        else:
+            request = events.update(calendarId=CALENDAR_ID, eventId=event_id, body=body)
+        requests.append((booking_id, request))
+
+    results = {}
+    for i in range(0, len(requests), MAX_BATCH_REQUESTS):
+        results.update(execute_batch(requests[i:i + MAX_BATCH_REQUESTS]))
+    return results
+
+
+def _event_gone(error) -> bool:
+    status = getattr(getattr(error, "resp", None), "status", None)
+    return str(status) in ("404", "410")
+
+
+def run_calendar_reconciliation(job):
+    """
+    Page through paid bookings by document id, batch the inserts/updates for
+    upcoming ones that are out of sync, and write event ids and hashes back
+    in one Firestore batch per page before checkpointing.
+    """
+    today = datetime.now(BUSINESS_TIMEZONE).strftime("%Y-%m-%d")
+    dry_run = bool(job.params.get("dryRun"))
+    query = (
+        db.collection("bookings")
+        .where("paymentStatus", "in", SYNC_PAYMENT_STATUSES)
+        .select(SYNC_FIELDS)
+        .order_by("__name__")
+        .limit(SYNC_PAGE_SIZE)
+    )
+
+    while True:
+        page_query = query
+        if job.cursor:
+            page_query = query.start_after({"__name__": db.collection("bookings").document(job.cursor)})
+        page = list(page_query.stream())
+        if not page:
+            break
+
+        planned = {}
+        hashes = {}
+        for doc in page:
+            booking = doc.to_dict() or {}
+            event_date = normalize_date(booking.get("date") or booking.get("eventDate"))
+            if not event_date or event_date < today:
+                job.count("past")
+                continue
+            try:
+                action, body, content_hash = plan_sync(booking)
+            except ValueError as exc:
+                job.fail({"id": doc.id, "reason": str(exc)})
+                continue
+            if action is None:
+                job.count("inSync")
+                continue
+            job.count(f"to{action.capitalize()}")
+            planned[doc.id] = (action, booking.get("google_event_id"), body)
+            hashes[doc.id] = content_hash
+
+        if planned and not dry_run:
+            results = _run_requests(planned)
+
+            # Events deleted by hand in Google Calendar are recreated.
+            recreate = {
+                booking_id: ("insert", None, planned[booking_id][2])
+                for booking_id, (_, error) in results.items()
+                if error is not None and planned[booking_id][0] == "update" and _event_gone(error)
+            }
+            if recreate:
+                results.update(_run_requests(recreate))
+
+            batch = db.batch()
+            writes = 0
+            for booking_id, (event, error) in results.items():
+                if error is not None:
+                    job.fail({"id": booking_id, "reason": str(error)[:300]})
+                    continue
+                batch.update(db.collection("bookings").document(booking_id), {
+                    "google_event_id": (event or {}).get("id"),
+                    "google_event_hash": hashes[booking_id],
+                    "google_event_synced_at": firestore.SERVER_TIMESTAMP,
+                })
+                writes += 1
+            if writes:
+                batch.commit()
+            job.count("synced", writes)
+
+        job.count("processed", len(page))
+        job.checkpoint(cursor=page[-1].id)
+
+        if len(page) < SYNC_PAGE_SIZE:
+            break
+
+    return {"dryRun": dry_run, "counts": dict(job.progress)}
+
+
+register_job("calendar_reconciliation", run_calendar_reconciliation)
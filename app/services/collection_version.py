@@ -0,0 +1,31 @@
+from google.cloud import firestore
+
+from app.services.firebase_setup import db
+
+# One counter document per collection lets caches and clients detect that
+# something changed with a single read instead of rescanning the collection.
+VERSION_COLLECTION = "meta"
+
+
+def _version_ref(collection_name: str):
+    return db.collection(VERSION_COLLECTION).document(f"{collection_name}_version")
+
+
+def bump_collection_version(collection_name: str, writer=None):
+    """Increment a collection's version, optionally inside an existing batch/writer."""
+    payload = {
+        "version": firestore.Increment(1),
+        "updatedAt": firestore.SERVER_TIMESTAMP,
+    }
+    ref = _version_ref(collection_name)
+    if writer is not None:
+        writer.set(ref, payload, merge=True)
+    else:
+        ref.set(payload, merge=True)
+
+
+def get_collection_version(collection_name: str) -> int:
+    doc = _version_ref(collection_name).get()
+    if not doc.exists:
+        return 0
+    return int((doc.to_dict() or {}).get("version") or 0)
@@ -0,0 +1,130 @@
+import csv
+import math
+import os
+import re
+import statistics
+
+from google.cloud import firestore
+
+from app.services.firebase_setup import db
+from app.services.distance_service import (
+    BUSINESS_ADDRESS,
+    DISTANCE_CACHE_COLLECTION,
+    METERS_TO_MILES,
+    normalize_address,
+)
+from app.services.settings_store import settings_store
+
+# Offline fallback for when the Distance Matrix API is slow or over quota:
+# straight-line distance between ZIP/city centroids scaled by a road factor.
+# The calibrated factor is kept in settings/distance_estimate so every
+# instance picks it up from the settings cache, including after a restart.
+CENTROIDS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "zip_centroids.csv")
+EARTH_RADIUS_MILES = 3958.8
+DEFAULT_ROAD_FACTOR = float(os.getenv("DISTANCE_ROAD_FACTOR", "1.3"))
+ROAD_FACTOR_DOC = ("settings", "distance_estimate")
+
+# Approximate coordinates of BUSINESS_ADDRESS.
+BUSINESS_COORDS = (34.1640, -85.1230)
+
+_ZIP_PATTERN = re.compile(r"\b(\d{5})(?:-\d{4})?\b")
+
+
+def _load_centroids():
+    by_zip = {}
+    by_city = {}
+    with open(CENTROIDS_PATH, newline="") as f:
+        for row in csv.DictReader(f):
+            coords = (float(row["lat"]), float(row["lng"]))
+            by_zip[row["zip"]] = coords
+            # First ZIP listed for a city stands in for the whole city.
+            by_city.setdefault(row["city"].lower(), coords)
+    return by_zip, by_city
+
+
+_ZIP_CENTROIDS, _CITY_CENTROIDS = _load_centroids()
+
+
+def haversine_miles(a, b) -> float:
+    lat1, lng1 = map(math.radians, a)
+    lat2, lng2 = map(math.radians, b)
+    h = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(h))
+
+
+def geocode(address: str):
+    """Approximate coordinates from the ZIP, or failing that the city name."""
+    text = str(address or "")
+    zips = _ZIP_PATTERN.findall(text)
+    for zip_code in reversed(zips):
+        if zip_code in _ZIP_CENTROIDS:
+            return _ZIP_CENTROIDS[zip_code]
+
+    # City names follow the street, so the last city mentioned wins.
+    lowered = text.lower()
+    best, best_pos = None, -1
+    for city, coords in _CITY_CENTROIDS.items():
+        for match in re.finditer(rf"\b{re.escape(city)}\b", lowered):
+            if match.start() > best_pos:
+                best, best_pos = coords, match.start()
+    return best
+
+
+def _origin_coords(origin: str):
+    if normalize_address(origin) == normalize_address(BUSINESS_ADDRESS):
+        return BUSINESS_COORDS
+    return geocode(origin)
+
+
+def estimate_miles(origin: str, destination: str):
+    """Road-distance estimate in miles, or None when either end is unknown."""
+    start = _origin_coords(origin)
+    end = geocode(destination)
+    if not start or not end:
+        return None
+    return round(haversine_miles(start, end) * get_road_factor(), 1)
+
+
+def get_road_factor() -> float:
+    stored = (settings_store.get(*ROAD_FACTOR_DOC) or {}).get("roadFactor")
+    return float(stored) if stored else DEFAULT_ROAD_FACTOR
+
+
+def calibrate_road_factor(limit: int = 500) -> dict:
+    """
+    Fit the road factor to exact distances already in distance_cache: the
+    median ratio of cached road miles to centroid straight-line miles.
+    """
+    business_origin = normalize_address(BUSINESS_ADDRESS)
+    ratios = []
+    docs = (
+        db.collection(DISTANCE_CACHE_COLLECTION)
+        .where("origin", "==", business_origin)
+        .select(["destination", "meters"])
+        .limit(limit)
+        .stream()
+    )
+    for doc in docs:
+        data = doc.to_dict() or {}
+        coords = geocode(data.get("destination"))
+        if not coords or not data.get("meters"):
+            continue
+        straight = haversine_miles(BUSINESS_COORDS, coords)
+        # Very short hops are dominated by centroid error.
+        if straight < 3:
+            continue
+        ratios.append(data["meters"] * METERS_TO_MILES / straight)
+
+    if len(ratios) < 5:
+        return {"roadFactor": get_road_factor(), "samples": len(ratios)}
+
+    road_factor = round(statistics.median(ratios), 3)
+    stored = {"roadFactor": road_factor, "samples": len(ratios)}
+    db.collection(ROAD_FACTOR_DOC[0]).document(ROAD_FACTOR_DOC[1]).set(
+        {**stored, "calibratedAt": firestore.SERVER_TIMESTAMP}, merge=True
+    )
+    settings_store.note_write(*ROAD_FACTOR_DOC, stored)
+    return stored
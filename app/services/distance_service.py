@@ -0,0 +1,275 @@
+import asyncio
+import hashlib
+import os
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from fastapi.concurrency import run_in_threadpool
+from google.cloud import firestore
+
+from app.services.firebase_setup import db
+from app.services.http_client import get_http_client
+from app.services.ttl_cache import TTLCache
+
+BUSINESS_ADDRESS = "69 Thompson Road SE, Silver Creek, GA 30173"
+
+DISTANCE_MATRIX_URL = "https://maps.googleapis.com/maps/api/distancematrix/json"
+METERS_TO_MILES = 0.000621371
+# Distance Matrix accepts at most 25 destinations per request.
+MAX_DESTINATIONS_PER_REQUEST = 25
+MAPS_TIMEOUT_SECONDS = float(os.getenv("MAPS_TIMEOUT_SECONDS", "8"))
+
+DISTANCE_CACHE_COLLECTION = "distance_cache"
+MEMORY_CACHE_SIZE = int(os.getenv("DISTANCE_CACHE_SIZE", "2048"))
+MEMORY_CACHE_TTL_SECONDS = int(os.getenv("DISTANCE_CACHE_TTL", str(6 * 60 * 60)))
+# Road distances between fixed addresses rarely change.
+PERSISTENT_CACHE_TTL = timedelta(days=int(os.getenv("DISTANCE_CACHE_DAYS", "90")))
+
+_ABBREVIATIONS = {
+    "street": "st", "road": "rd", "avenue": "ave", "drive": "dr",
+    "lane": "ln", "court": "ct", "circle": "cir", "boulevard": "blvd",
+    "highway": "hwy", "parkway": "pkwy", "place": "pl", "terrace": "ter",
+    "north": "n", "south": "s", "east": "e", "west": "w",
+    "northeast": "ne", "northwest": "nw", "southeast": "se", "southwest": "sw",
+    "suite": "ste", "apartment": "apt", "georgia": "ga",
+}
+
+
+class DistanceLookupError(RuntimeError):
+    """Raised when Google returns a non-OK status for a route."""
+
+
+# -----------------------------
+# ADDRESS KEYS
+# -----------------------------
+def normalize_address(address: str) -> str:
+    """Canonical form so trivially different spellings share one cache entry."""
+    text = str(address or "").lower()
+    text = re.sub(r"[.,;]", " ", text)
+    words = [_ABBREVIATIONS.get(word, word) for word in text.split()]
+    return " ".join(words)
+
+
+def distance_key(origin: str, destination: str) -> str:
+    raw = f"{normalize_address(origin)}|{normalize_address(destination)}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+_memory_cache = TTLCache(MEMORY_CACHE_SIZE, MEMORY_CACHE_TTL_SECONDS)
+# Lookups in progress on the event loop, keyed by distance_key.
+_in_flight = {}
+_stats_lock = threading.Lock()
+_stats = {
+    "lookups": 0,
+    "memoryHits": 0,
+    "firestoreHits": 0,
+    "coalesced": 0,
+    "outboundCalls": 0,
+    "errors": 0,
+}
+
+
+def _count(name: str, amount: int = 1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def get_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    hits = stats["memoryHits"] + stats["firestoreHits"] + stats["coalesced"]
+    stats["hitRate"] = round(hits / stats["lookups"], 4) if stats["lookups"] else 0
+    stats["memoryEntries"] = len(_memory_cache)
+    return stats
+
+
+# -----------------------------
+# PERSISTENT CACHE
+# -----------------------------
+def _read_persistent(key: str):
+    doc = db.collection(DISTANCE_CACHE_COLLECTION).document(key).get()
+    if not doc.exists:
+        return None
+    data = doc.to_dict() or {}
+    fetched_at = data.get("fetchedAt")
+    if isinstance(fetched_at, datetime) and fetched_at < datetime.now(timezone.utc) - PERSISTENT_CACHE_TTL:
+        return None
+    return data.get("meters")
+
+
+def _write_persistent(key: str, origin: str, destination: str, meters: int):
+    db.collection(DISTANCE_CACHE_COLLECTION).document(key).set({
+        "origin": normalize_address(origin),
+        "destination": normalize_address(destination),
+        "meters": meters,
+        "fetchedAt": firestore.SERVER_TIMESTAMP,
+    })
+
+
+# -----------------------------
+# GOOGLE DISTANCE MATRIX
+# -----------------------------
+async def _fetch_meters_many(origin: str, destinations: list) -> list:
+    """One Distance Matrix request for up to 25 destinations; errors per element."""
+    api_key = os.getenv("GOOGLE_MAPS_API_KEY")
+    if not api_key:
+        raise RuntimeError("GOOGLE_MAPS_API_KEY is not configured")
+
+    _count("outboundCalls")
+    response = await get_http_client().get(
+        DISTANCE_MATRIX_URL,
+        params={
+            "origins": origin,
+            "destinations": "|".join(d.replace("|", " ") for d in destinations),
+            "units": "imperial",
+            "key": api_key,
+        },
+        timeout=MAPS_TIMEOUT_SECONDS,
+    )
+    response.raise_for_status()
+    payload = response.json()
+    if payload.get("status") != "OK":
+        raise DistanceLookupError(f"Google API Error: {payload.get('status', 'Unknown')}")
+
+    results = []
+    for element in payload["rows"][0]["elements"]:
+        if element.get("status") == "OK":
+            results.append(element["distance"]["value"])
+        else:
+            results.append(DistanceLookupError(f"Google Element Error: {element.get('status', 'Unknown')}"))
+    return results
+
+
+async def _fetch_meters(origin: str, destination: str) -> int:
+    meters = (await _fetch_meters_many(origin, [destination]))[0]
+    if isinstance(meters, Exception):
+        raise meters
+    return meters
+
+
+async def _resolve(key: str, origin: str, destination: str) -> int:
+    meters = await run_in_threadpool(_read_persistent, key)
+    if meters is not None:
+        _count("firestoreHits")
+        return meters
+
+    meters = await _fetch_meters(origin, destination)
+    try:
+        await run_in_threadpool(_write_persistent, key, origin, destination, meters)
+    except Exception as exc:
+        print(f"Distance cache write failed: {exc}")
+    return meters
+
+
+async def get_distance_meters(origin: str, destination: str) -> int:
+    """
+    Road distance in meters, served from memory, then Firestore, then Google.
+    Identical concurrent lookups share a single outbound request.
+    """
+    _count("lookups")
+    key = distance_key(origin, destination)
+
+    meters = _memory_cache.get(key)
+    if meters is not None:
+        _count("memoryHits")
+        return meters
+
+    task = _in_flight.get(key)
+    if task is not None:
+        _count("coalesced")
+        return await asyncio.shield(task)
+
+    task = asyncio.ensure_future(_resolve(key, origin, destination))
+    _in_flight[key] = task
+    try:
+        meters = await asyncio.shield(task)
+        _memory_cache.set(key, meters)
+        return meters
+    except Exception:
+        _count("errors")
+        raise
+    finally:
+        _in_flight.pop(key, None)
+
+
+async def get_distance_miles(origin: str, destination: str) -> float:
+    return (await get_distance_meters(origin, destination)) * METERS_TO_MILES
+
+
+def _read_persistent_many(keys: list) -> dict:
+    refs = [db.collection(DISTANCE_CACHE_COLLECTION).document(key) for key in keys]
+    cutoff = datetime.now(timezone.utc) - PERSISTENT_CACHE_TTL
+    found = {}
+    for doc in db.get_all(refs):
+        if not doc.exists:
+            continue
+        data = doc.to_dict() or {}
+        fetched_at = data.get("fetchedAt")
+        if isinstance(fetched_at, datetime) and fetched_at < cutoff:
+            continue
+        if data.get("meters") is not None:
+            found[doc.id] = data["meters"]
+    return found
+
+
+def _write_persistent_many(origin: str, entries: dict):
+    batch = db.batch()
+    for key, (destination, meters) in entries.items():
+        batch.set(db.collection(DISTANCE_CACHE_COLLECTION).document(key), {
+            "origin": normalize_address(origin),
+            "destination": normalize_address(destination),
+            "meters": meters,
+            "fetchedAt": firestore.SERVER_TIMESTAMP,
+        })
+    batch.commit()
+
+
+async def get_distance_meters_many(origin: str, destinations: list) -> dict:
+    """
+    Resolve up to 25 destinations at once. Cached entries are served from
+    memory or one batched Firestore read; the rest share a single outbound
+    request. Returns {destination: meters or DistanceLookupError}.
+    """
+    if len(destinations) > MAX_DESTINATIONS_PER_REQUEST:
+        raise ValueError(f"At most {MAX_DESTINATIONS_PER_REQUEST} destinations per lookup")
+
+    results = {}
+    pending = defaultdict(list)  # key -> every destination string that normalizes to it
+    for destination in destinations:
+        _count("lookups")
+        key = distance_key(origin, destination)
+        meters = _memory_cache.get(key)
+        if meters is not None:
+            _count("memoryHits")
+            results[destination] = meters
+        else:
+            pending[key].append(destination)
+
+    if pending:
+        for key, meters in (await run_in_threadpool(_read_persistent_many, list(pending))).items():
+            _count("firestoreHits")
+            _memory_cache.set(key, meters)
+            for destination in pending.pop(key):
+                results[destination] = meters
+
+    if pending:
+        keys = list(pending)
+        fetched = await _fetch_meters_many(origin, [pending[key][0] for key in keys])
+        to_persist = {}
+        for key, value in zip(keys, fetched):
+            for destination in pending[key]:
+                results[destination] = value
+            if isinstance(value, Exception):
+                _count("errors")
+                continue
+            _memory_cache.set(key, value)
+            to_persist[key] = (pending[key][0], value)
+        if to_persist:
+            try:
+                await run_in_threadpool(_write_persistent_many, origin, to_persist)
+            except Exception as exc:
+                print(f"Distance cache write failed: {exc}")
+
+    return results
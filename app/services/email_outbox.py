@@ -0,0 +1,243 @@
+import asyncio
+import os
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+
+import resend
+from fastapi.concurrency import run_in_threadpool
+from google.cloud import firestore
+
+from app.services.firebase_setup import db
+
+# Senders enqueue fully rendered Resend payloads here; a worker drains the
+# queue through Resend's batch API so request paths never wait on email.
+OUTBOX_COLLECTION = "email_outbox"
+RESEND_BATCH_LIMIT = 100
+MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_CAP_SECONDS = 60 * 60
+CLAIM_TIMEOUT = timedelta(minutes=10)
+# Resend statuses caused by one message's content; anything else (429, 5xx,
+# network errors) is about the service and backs off the whole batch.
+MESSAGE_ERROR_STATUSES = {400, 403, 422}
+WORKER_INTERVAL_SECONDS = float(os.getenv("EMAIL_OUTBOX_INTERVAL", "15"))
+
+_wake = threading.Event()
+_drain_lock = threading.Lock()
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+# -----------------------------
+# ENQUEUE
+# -----------------------------
+def enqueue_email(payload: dict, meta: dict = None, writer=None) -> str:
+    """
+    Persist a rendered Resend payload for delivery and wake the worker.
+    With a batch as `writer`, the message commits together with the
+    caller's other writes; call wake_outbox_worker() after committing.
+    """
+    ref = db.collection(OUTBOX_COLLECTION).document()
+    message = {
+        "payload": payload,
+        "meta": meta or {},
+        "status": "queued",
+        "attempts": 0,
+        "nextAttemptAt": _now(),
+        "createdAt": firestore.SERVER_TIMESTAMP,
+    }
+    if writer is not None:
+        writer.set(ref, message)
+    else:
+        ref.set(message)
+        _wake.set()
+    return ref.id
+
+
+def wake_outbox_worker():
+    _wake.set()
+
+
+# -----------------------------
+# CLAIM / COMPLETE
+# -----------------------------
+def _claim_due(limit: int) -> list:
+    """Mark due messages as sending; a conditional write keeps claims exclusive."""
+    now = _now()
+    due = list(
+        db.collection(OUTBOX_COLLECTION)
+        .where("status", "==", "queued")
+        .where("nextAttemptAt", "<=", now)
+        .order_by("nextAttemptAt")
+        .limit(limit)
+        .stream()
+    )
+    stale = list(
+        db.collection(OUTBOX_COLLECTION)
+        .where("status", "==", "sending")
+        .where("claimedAt", "<=", now - CLAIM_TIMEOUT)
+        .limit(limit)
+        .stream()
+    )
+
+    claimed = []
+    for doc in (due + stale)[:limit]:
+        try:
+            doc.reference.update(
+                {"status": "sending", "claimedAt": now},
+                option=db.write_option(last_update_time=doc.update_time),
+            )
+        except Exception:
+            continue  # claimed by another worker
+        claimed.append(doc)
+    return claimed
+
+
+def _backoff(attempts: int) -> timedelta:
+    delay = min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _mark_results(results: list):
+    """results: [(doc, resend_id or None, error or None)] written in one batch."""
+    batch = db.batch()
+    for doc, resend_id, error in results:
+        data = doc.to_dict() or {}
+        if error is None:
+            batch.update(doc.reference, {
+                "status": "sent",
+                "resendId": resend_id,
+                "sentAt": firestore.SERVER_TIMESTAMP,
+                "lastError": firestore.DELETE_FIELD,
+            })
+            continue
+
+        attempts = int(data.get("attempts") or 0) + 1
+        dead = attempts >= MAX_ATTEMPTS
+        batch.update(doc.reference, {
+            "status": "failed" if dead else "queued",
+            "attempts": attempts,
+            "lastError": str(error)[:1000],
+            "nextAttemptAt": _now() + _backoff(attempts),
+        })
+        print(f"EMAIL OUTBOX {'GAVE UP' if dead else 'RETRY'} ({doc.id}, attempt {attempts}): {error}")
+    batch.commit()
+    _record_on_bookings(results)
+
+
+def _record_on_bookings(results: list):
+    """Write the delivery outcome onto the booking a message was sent for."""
+    for doc, resend_id, error in results:
+        data = doc.to_dict() or {}
+        booking_id = (data.get("meta") or {}).get("booking_id")
+        if not booking_id:
+            continue
+        if error is None:
+            update = {"last_email_id": resend_id, "emailStatus": "Sent"}
+        elif int(data.get("attempts") or 0) + 1 >= MAX_ATTEMPTS:
+            update = {"emailStatus": "Failed"}
+        else:
+            continue
+        try:
+            db.collection("bookings").document(booking_id).update(update)
+        except Exception as exc:
+            # The booking may have been deleted since the email was queued.
+            print(f"EMAIL OUTBOX could not update booking {booking_id}: {exc}")
+
+
+# -----------------------------
+# SENDING
+# -----------------------------
+def _batchable(payload: dict) -> bool:
+    # Resend's batch endpoint does not accept attachments.
+    return not payload.get("attachments")
+
+
+def _is_message_error(exc: Exception) -> bool:
+    try:
+        return int(getattr(exc, "code", None)) in MESSAGE_ERROR_STATUSES
+    except (TypeError, ValueError):
+        return False
+
+
+def _send_individually(docs: list) -> list:
+    results = []
+    for i, doc in enumerate(docs):
+        try:
+            response = resend.Emails.send(doc.to_dict()["payload"])
+            results.append((doc, (response or {}).get("id"), None))
+        except Exception as exc:
+            if not _is_message_error(exc):
+                # Rate limited or unavailable: the rest wait for the backoff too.
+                return results + [(rest, None, exc) for rest in docs[i:]]
+            results.append((doc, None, exc))
+    return results
+
+
+def _send_batch(docs: list) -> list:
+    try:
+        response = resend.Batch.send([doc.to_dict()["payload"] for doc in docs])
+    except Exception as exc:
+        if not _is_message_error(exc):
+            print(f"EMAIL OUTBOX batch send failed, backing off: {exc}")
+            return [(doc, None, exc) for doc in docs]
+        # One invalid message fails the whole batch; isolate it by sending singly.
+        print(f"EMAIL OUTBOX batch rejected, retrying individually: {exc}")
+        return _send_individually(docs)
+
+    sent = (response or {}).get("data") or []
+    return [
+        (doc, sent[i].get("id") if i < len(sent) else None, None)
+        for i, doc in enumerate(docs)
+    ]
+
+
+def drain_outbox(max_messages: int = 500) -> dict:
+    """Send due messages in Resend-sized chunks; safe to call concurrently."""
+    if not _drain_lock.acquire(blocking=False):
+        return {"status": "busy"}
+
+    sent = failed = 0
+    try:
+        while sent + failed < max_messages:
+            claimed = _claim_due(min(RESEND_BATCH_LIMIT, max_messages - sent - failed))
+            if not claimed:
+                break
+
+            batchable = [d for d in claimed if _batchable(d.to_dict()["payload"])]
+            singles = [d for d in claimed if not _batchable(d.to_dict()["payload"])]
+
+            results = []
+            if batchable:
+                results.extend(_send_batch(batchable))
+            if singles:
+                results.extend(_send_individually(singles))
+            _mark_results(results)
+
+            sent += sum(1 for _, _, error in results if error is None)
+            failed += sum(1 for _, _, error in results if error is not None)
+            if any(error is not None and not _is_message_error(error) for _, _, error in results):
+                break  # Resend is throttling or down; leave the rest for the next pass.
+    finally:
+        _drain_lock.release()
+
+    return {"status": "ok", "sent": sent, "failed": failed}
+
+
+# -----------------------------
+# BACKGROUND WORKER
+# -----------------------------
+async def outbox_worker():
+    """Drain on every enqueue, and on an interval to pick up retries."""
+    while True:
+        try:
+            await run_in_threadpool(_wake.wait, WORKER_INTERVAL_SECONDS)
+            _wake.clear()
+            await run_in_threadpool(drain_outbox)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            print(f"EMAIL OUTBOX worker error: {exc}")
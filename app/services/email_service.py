@@ -1,8 +1,11 @@
 import os
+import threading
 import resend
 from dotenv import load_dotenv
 from app.root_schema import normalize_payload, validate_payload, build_square_metadata
 from app.services.firebase_setup import db
+from app.services.email_templates import render_template
+from app.services.email_outbox import enqueue_email
 
 load_dotenv()
 resend.api_key = os.getenv("RESEND_API_KEY")
@@ -47,36 +50,75 @@ def generate_ics_content(booking_data):
 # -------------------------------------------------
 # Fully Backed-Up Email Service
 # -------------------------------------------------
-def send_email_template(to, template_id=None, data=None, html_content=None, attachments=None):
+# Fields backfilled from the booking when the caller's data leaves them empty
+BACKUP_FIELDS = [
+    "name", "email", "date", "remaining", "deposit", "total",
+    "address", "phone", "deliveryTime", "pickupTime",
+    "status", "paymentStatus", "referral_type",
+    "saveCardForAutopay", "signature", "items", "pricing_breakdown"
+]
+
+# A caller's booking counts as complete unless one of these is absent;
+# without a booking_id these are also the only fields copied from it
+ESSENTIAL_FIELDS = ["name", "email", "date"]
+
+_backup_read_stats = {"readsAvoided": 0, "readsPerformed": 0}
+_backup_read_lock = threading.Lock()
+
+
+def _count_backup_read(name: str):
+    with _backup_read_lock:
+        _backup_read_stats[name] += 1
+
+
+def get_backup_read_stats():
+    with _backup_read_lock:
+        return dict(_backup_read_stats)
+
+
+def send_email_template(to, template_id=None, data=None, html_content=None, attachments=None, booking=None, writer=None):
+    """
+    With `booking_id` in data, every BACKUP_FIELDS entry the caller left
+    empty is filled from the booking. Pass `booking` as well when the caller
+    already holds it; Firestore is then read only if it lacks an essential
+    field. Without a booking_id, `booking` only fills ESSENTIAL_FIELDS and
+    `to`. Pass a batch as `writer` to queue the email atomically with the
+    caller's own writes.
+    """
     try:
         data = data or {}
 
         # -------------------------------------------------
-        # 1. Firestore Backup Lookup
+        # 1. Booking Backup (caller's copy first, Firestore last)
         # -------------------------------------------------
         booking_id = data.get("booking_id")
-        booking = None
+        source = None
+        fields = ESSENTIAL_FIELDS
 
         if booking_id:
-            booking = get_booking_by_id(booking_id)
-
-            if booking:
-                # List of all fields we want to back up
-                backup_fields = [
-                    "name", "email", "date", "remaining", "deposit", "total",
-                    "address", "phone", "deliveryTime", "pickupTime",
-                    "status", "paymentStatus", "referral_type",
-                    "saveCardForAutopay", "signature", "items", "pricing_breakdown"
-                ]
-
-                # Merge missing fields from Firestore
-                for field in backup_fields:
-                    if not data.get(field):
-                        data[field] = booking.get(field)
-
-                # Fix missing "to"
-                if not to:
-                    to = booking.get("email")
+            source = booking or {}
+            fields = BACKUP_FIELDS
+            missing = [f for f in ESSENTIAL_FIELDS if not data.get(f) and not source.get(f)]
+
+            if booking is None or missing:
+                stored = get_booking_by_id(booking_id)
+                _count_backup_read("readsPerformed")
+                if stored:
+                    source = {**stored, **source}
+            else:
+                _count_backup_read("readsAvoided")
+        elif booking is not None:
+            source = booking
+
+        if source is not None:
+            # Merge missing fields from the booking
+            for field in fields:
+                if not data.get(field):
+                    data[field] = source.get(field)
+
+            # Fix missing "to"
+            if not to:
+                to = source.get("email")
 
         # -------------------------------------------------
         # 2. Final Safety Check for "to"
@@ -108,25 +150,25 @@ def send_email_template(to, template_id=None, data=None, html_content=None, atta
             params["attachments"] = attachments
 
         # -------------------------------------------------
-        # 4. Send Email
+        # 4. Queue Email (the outbox worker delivers and retries)
         # -------------------------------------------------
-        response = resend.Emails.send(params)
-        print(f"RESEND SUCCESS: Sent to {recipients}")
-        return {"status": "success", "response": response}
+        meta = {"booking_id": booking_id or (booking or {}).get("booking_id"), "template_id": template_id}
+        outbox_id = enqueue_email(params, meta=meta, writer=writer)
+        print(f"EMAIL QUEUED: {outbox_id} for {recipients}")
+        return {"status": "queued", "outbox_id": outbox_id}
 
     except Exception as e:
         print(f"CRITICAL EMAIL ERROR: {str(e)}")
         return {"status": "error", "message": str(e)}
-def send_email_from_file(to, template_name, subject, params):
+def send_email_from_file(to, template_name, subject, params, booking_id=None, writer=None):
+    """
+    With `booking_id`, the outbox records the Resend id and emailStatus on
+    that booking once delivered. Pass a batch as `writer` to queue the email
+    with the caller's own writes; call wake_outbox_worker() after committing.
+    """
     try:
-        # 1. Load HTML file
-        template_path = os.path.join("app", "email_templates", template_name)
-        with open(template_path, "r") as f:
-            html = f.read()
-
-        # 2. Replace {{variables}}
-        for key, value in params.items():
-            html = html.replace(f"{{{{{key}}}}}", str(value))
+        # 1-2. Render the precompiled template (values are HTML-escaped)
+        html = render_template(template_name, params)
 
         # 3. Build Resend payload
         recipients = to if isinstance(to, list) else [to]
@@ -138,10 +180,11 @@ def send_email_from_file(to, template_name, subject, params):
             "html": html
         }
 
-        # 4. Send email
-        response = resend.Emails.send(payload)
-        print(f"RESEND SUCCESS (file template): Sent to {recipients}")
-        return {"status": "success", "response": response}
+        # 4. Queue email (the outbox worker delivers and retries)
+        meta = {"template_name": template_name, "booking_id": booking_id}
+        outbox_id = enqueue_email(payload, meta=meta, writer=writer)
+        print(f"EMAIL QUEUED (file template): {outbox_id} for {recipients}")
+        return {"status": "queued", "outbox_id": outbox_id}
 
     except Exception as e:
         print(f"CRITICAL EMAIL ERROR (file template): {str(e)}")
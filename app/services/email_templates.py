@@ -0,0 +1,76 @@
+import html
+import os
+import re
+import threading
+
+# HTML email templates are read and compiled once into alternating literal
+# and placeholder segments; rendering is a single join with escaped values.
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "email_templates")
+PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+
+# Re-read a template whenever its file changes (local development only).
+HOT_RELOAD = os.getenv("EMAIL_TEMPLATE_HOT_RELOAD", "").lower() in ("1", "true", "yes")
+
+
+class CompiledTemplate:
+    def __init__(self, name: str, source: str, mtime: float = 0.0):
+        self.name = name
+        self.mtime = mtime
+        # Even indexes are literal text, odd indexes are placeholder names.
+        self.segments = PLACEHOLDER.split(source)
+        self.placeholders = set(self.segments[1::2])
+
+    def render(self, params: dict) -> str:
+        out = []
+        for index, segment in enumerate(self.segments):
+            if index % 2 == 0:
+                out.append(segment)
+            elif segment in params:
+                out.append(html.escape(str(params[segment])))
+            else:
+                # Unknown placeholders are left visible, as before.
+                out.append("{{" + segment + "}}")
+        return "".join(out)
+
+
+_templates = {}
+_lock = threading.Lock()
+
+
+def _compile_file(name: str) -> CompiledTemplate:
+    path = os.path.join(TEMPLATE_DIR, name)
+    with open(path, "r") as f:
+        source = f.read()
+    return CompiledTemplate(name, source, os.path.getmtime(path))
+
+
+def load_templates() -> list:
+    """Compile every template in TEMPLATE_DIR; called once at startup."""
+    compiled = {
+        name: _compile_file(name)
+        for name in sorted(os.listdir(TEMPLATE_DIR))
+        if name.endswith(".html")
+    }
+    with _lock:
+        _templates.clear()
+        _templates.update(compiled)
+    return list(compiled)
+
+
+def get_template(name: str) -> CompiledTemplate:
+    template = _templates.get(name)
+    if template is None:
+        template = _compile_file(name)
+        with _lock:
+            _templates[name] = template
+    elif HOT_RELOAD:
+        mtime = os.path.getmtime(os.path.join(TEMPLATE_DIR, name))
+        if mtime != template.mtime:
+            template = _compile_file(name)
+            with _lock:
+                _templates[name] = template
+    return template
+
+
+def render_template(name: str, params: dict) -> str:
+    return get_template(name).render(params or {})
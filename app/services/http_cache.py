@@ -0,0 +1,6 @@
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """True when an If-None-Match header covers etag (weak comparison)."""
+    if not if_none_match or not etag:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
@@ -0,0 +1,36 @@
+import httpx
+
+# One pooled client for outbound Google Maps traffic: keep-alive connections
+# are reused across requests instead of paying a TLS handshake per call.
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+
+_client = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the shared AsyncClient, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=_http2_available(),
+            limits=POOL_LIMITS,
+            timeout=DEFAULT_TIMEOUT,
+            headers={"User-Agent": "buzzys-backend"},
+        )
+    return _client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
@@ -0,0 +1,98 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+from google.cloud import firestore
+
+from app.services.firebase_setup import db
+from app.services.ttl_cache import TTLCache
+
+# Stripe pushes every invoice state change through webhooks, so a recently
+# recorded status is trusted instead of calling stripe.Invoice.retrieve.
+INVOICE_STATE_MAX_AGE = timedelta(seconds=int(os.getenv("INVOICE_STATE_MAX_AGE", str(6 * 60 * 60))))
+
+# Webhooks can arrive out of order; a later-stage status is never replaced
+# by an earlier one (e.g. a late invoice.finalized after invoice.paid).
+STATUS_RANK = {"pending": 0, "failed": 0, "draft": 1, "open": 2, "paid": 3, "void": 3, "uncollectible": 3}
+
+_states = TTLCache(4096, int(INVOICE_STATE_MAX_AGE.total_seconds()))
+
+
+def _is_downgrade(current, new) -> bool:
+    return STATUS_RANK.get(new, 0) < STATUS_RANK.get(current, 0)
+
+
+def remember_invoice_state(invoice_id: str, status: str):
+    """Record a status learned from Stripe in the in-process LRU."""
+    if not invoice_id or not status:
+        return
+    current = _states.get(invoice_id)
+    if current and _is_downgrade(current, status):
+        return
+    _states.set(invoice_id, status)
+
+
+def get_fresh_invoice_state(invoice_id: str, booking: dict = None):
+    """
+    Return the invoice's status if it was recorded recently enough to skip a
+    Stripe retrieve: the LRU first, then the fields stored on the booking.
+    """
+    if not invoice_id:
+        return None
+
+    status = _states.get(invoice_id)
+    if status:
+        return status
+
+    booking = booking or {}
+    if booking.get("stripe_remaining_invoice_id") != invoice_id:
+        return None
+    status = booking.get("stripe_invoice_status")
+    recorded_at = booking.get("stripe_invoice_status_at")
+    if status not in STATUS_RANK or status in ("pending", "failed"):
+        return None
+    if not isinstance(recorded_at, datetime):
+        return None
+    if recorded_at < datetime.now(timezone.utc) - INVOICE_STATE_MAX_AGE:
+        return None
+
+    _states.set(invoice_id, status)
+    return status
+
+
+def state_fields(status: str) -> dict:
+    """Booking fields that persist a freshly learned invoice status."""
+    return {
+        "stripe_invoice_status": status,
+        "stripe_invoice_status_at": firestore.SERVER_TIMESTAMP,
+    }
+
+
+def record_invoice_event(invoice) -> dict:
+    """
+    Apply an invoice.* webhook (finalized, sent, voided, ...) to the cache
+    and to the booking, without downgrading a later status.
+    """
+    invoice_id = invoice.get("id")
+    status = invoice.get("status")
+    booking_id = (invoice.get("metadata") or {}).get("booking_id")
+    remember_invoice_state(invoice_id, status)
+    if not booking_id or not status:
+        return {"status": "ignored"}
+
+    doc_ref = db.collection("bookings").document(booking_id)
+    booking = doc_ref.get().to_dict() or {}
+    if booking.get("stripe_remaining_invoice_id") not in (None, invoice_id):
+        return {"status": "ignored", "reason": "different invoice"}
+    if _is_downgrade(booking.get("stripe_invoice_status"), status):
+        return {"status": "ignored", "reason": "stale event"}
+
+    updates = {
+        "stripe_remaining_invoice_id": invoice_id,
+        **state_fields(status),
+    }
+    if invoice.get("hosted_invoice_url"):
+        updates["stripe_hosted_invoice_url"] = invoice.get("hosted_invoice_url")
+    if invoice.get("invoice_pdf"):
+        updates["stripe_invoice_pdf"] = invoice.get("invoice_pdf")
+    doc_ref.update(updates)
+    return {"status": "updated", "invoice_status": status}
@@ -0,0 +1,123 @@
+import threading
+import uuid
+from datetime import datetime
+
+from google.cloud import firestore
+
+from app.services.firebase_setup import db
+
+# Long-running admin work runs outside the request and records its progress
+# in jobs/{id}, so it can be polled and resumed from its last checkpoint.
+JOBS_COLLECTION = "jobs"
+MAX_RECORDED_FAILURES = 100
+
+_runners = {}
+_active = set()
+_active_lock = threading.Lock()
+
+
+class JobContext:
+    """Handed to a job runner; carries params, cursor and progress counters."""
+
+    def __init__(self, job_id: str, data: dict):
+        self.id = job_id
+        self.kind = data.get("type")
+        self.params = data.get("params") or {}
+        self.cursor = data.get("cursor")
+        self.progress = dict(data.get("progress") or {})
+        self.failures = list(data.get("failures") or [])
+        self.ref = db.collection(JOBS_COLLECTION).document(job_id)
+
+    def count(self, name: str, amount: int = 1):
+        self.progress[name] = self.progress.get(name, 0) + amount
+
+    def fail(self, item: dict):
+        self.count("failed")
+        if len(self.failures) < MAX_RECORDED_FAILURES:
+            self.failures.append(item)
+
+    def checkpoint(self, cursor=None, **fields):
+        """Persist the cursor and progress; a resumed job continues from here."""
+        if cursor is not None:
+            self.cursor = cursor
+        self.ref.update({
+            "cursor": self.cursor,
+            "progress": self.progress,
+            "failures": self.failures,
+            "updatedAt": firestore.SERVER_TIMESTAMP,
+            **fields,
+        })
+
+
+def register_job(kind: str, runner):
+    _runners[kind] = runner
+
+
+def create_job(kind: str, params: dict = None, actor: str = None) -> str:
+    if kind not in _runners:
+        raise ValueError(f"Unknown job type '{kind}'")
+    job_id = str(uuid.uuid4())
+    db.collection(JOBS_COLLECTION).document(job_id).set({
+        "type": kind,
+        "status": "queued",
+        "params": params or {},
+        "cursor": None,
+        "progress": {},
+        "failures": [],
+        "createdBy": actor,
+        "createdAt": firestore.SERVER_TIMESTAMP,
+        "updatedAt": firestore.SERVER_TIMESTAMP,
+    })
+    return job_id
+
+
+def get_job(job_id: str):
+    doc = db.collection(JOBS_COLLECTION).document(job_id).get()
+    if not doc.exists:
+        return None
+    data = doc.to_dict() or {}
+    data["id"] = doc.id
+    return data
+
+
+def is_running(job_id: str) -> bool:
+    with _active_lock:
+        return job_id in _active
+
+
+def run_job(job_id: str):
+    """Execute (or resume) a job. Run it via BackgroundTasks so runners can reach the event loop."""
+    with _active_lock:
+        if job_id in _active:
+            print(f"Job {job_id} is already running in this process")
+            return
+        _active.add(job_id)
+
+    try:
+        job = get_job(job_id)
+        if not job:
+            print(f"Job {job_id} not found")
+            return
+        if job.get("status") == "completed":
+            return
+
+        ctx = JobContext(job_id, job)
+        runner = _runners.get(ctx.kind)
+        if runner is None:
+            ctx.checkpoint(status="failed", error=f"No runner registered for '{ctx.kind}'")
+            return
+
+        ctx.checkpoint(status="running", startedAt=job.get("startedAt") or datetime.utcnow().isoformat())
+        try:
+            summary = runner(ctx)
+            ctx.checkpoint(
+                status="completed",
+                summary=summary or {},
+                finishedAt=firestore.SERVER_TIMESTAMP,
+            )
+        except Exception as exc:
+            print(f"Job {job_id} ({ctx.kind}) failed: {exc}")
+            ctx.checkpoint(status="failed", error=str(exc)[:1000])
+    finally:
+        with _active_lock:
+            _active.discard(job_id)
@@ -0,0 +1,131 @@
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud import firestore
+
+from app.services.firebase_setup import bucket, db
+from app.services.jobs import register_job
+from app.services.settings_store import settings_store
+
+# One document per stored file. Uploads are keyed by the SHA-256 of their
+# content, so the document id doubles as the dedup index. Entries from the
+# old settings/media "files" array keep their original ids.
+MEDIA_COLLECTION = "media"
+MEDIA_PAGE_SIZE = 50
+MEDIA_MAX_PAGE_SIZE = 200
+MAX_BATCH_WRITES = 400
+LEGACY_DOC = ("settings", "media")
+
+
+def media_collection():
+    return db.collection(MEDIA_COLLECTION)
+
+
+def find_by_hash(content_hash: str):
+    doc = media_collection().document(content_hash).get()
+    if not doc.exists:
+        return None
+    entry = doc.to_dict() or {}
+    entry["id"] = doc.id
+    return entry
+
+
+def save_entry(entry: dict):
+    """
+    Create the entry under its id. Returns the stored entry, which is an
+    existing one if the same content was uploaded concurrently.
+    """
+    try:
+        media_collection().document(entry["id"]).create({
+            **entry,
+            "createdAt": firestore.SERVER_TIMESTAMP,
+        })
+        return entry, True
+    except AlreadyExists:
+        return find_by_hash(entry["id"]), False
+
+
+def list_entries(limit: int = MEDIA_PAGE_SIZE, cursor: str = None) -> dict:
+    """Return one page of media entries, newest first."""
+    limit = max(1, min(int(limit), MEDIA_MAX_PAGE_SIZE))
+    col = media_collection()
+    query = col.order_by("createdAt", direction=firestore.Query.DESCENDING).limit(limit)
+
+    if cursor:
+        cursor_doc = col.document(cursor).get()
+        if not cursor_doc.exists:
+            raise ValueError("Invalid media cursor")
+        query = query.start_after(cursor_doc)
+
+    files = []
+    for doc in query.stream():
+        entry = doc.to_dict() or {}
+        entry["id"] = doc.id
+        entry.pop("createdAt", None)
+        files.append(entry)
+
+    next_cursor = files[-1]["id"] if len(files) == limit else None
+    return {"files": files, "nextCursor": next_cursor}
+
+
+def legacy_entries() -> list:
+    """Entries still in the settings/media array (served from the settings cache)."""
+    legacy = settings_store.get(*LEGACY_DOC) or {}
+    return [dict(entry) for entry in legacy.get("files", [])]
+
+
+def delete_entry(file_id: str):
+    """Remove the entry and return it so its blobs can be deleted, or None."""
+    ref = media_collection().document(file_id)
+    doc = ref.get()
+    if doc.exists:
+        entry = doc.to_dict() or {}
+        entry["id"] = doc.id
+        ref.delete()
+        return entry
+
+    legacy = next((f for f in legacy_entries() if f.get("id") == file_id), None)
+    if legacy:
+        db.collection(LEGACY_DOC[0]).document(LEGACY_DOC[1]).update({"files": firestore.ArrayRemove([legacy])})
+        remaining = [f for f in legacy_entries() if f.get("id") != file_id]
+        settings_store.note_write(*LEGACY_DOC, {"files": remaining})
+    return legacy
+
+
+def delete_blobs(paths: list, file_id: str = None):
+    """
+    Delete storage objects; run from a background task. With file_id, the
+    deletion is skipped if that entry exists again: the same content was
+    re-uploaded after the delete and now owns the same hash-keyed paths.
+    """
+    if file_id and media_collection().document(file_id).get().exists:
+        print(f"MEDIA: {file_id} was re-uploaded; keeping its blobs")
+        return
+    for path in paths:
+        try:
+            bucket.blob(path).delete()
+        except NotFound:
+            pass
+        except Exception as exc:
+            print(f"MEDIA: failed to delete {path}: {exc}")
+
+
+def migrate_legacy_media(job):
+    """Copy settings/media "files" entries into the media collection, then clear the array."""
+    entries = legacy_entries()
+    for i in range(0, len(entries), MAX_BATCH_WRITES):
+        batch = db.batch()
+        for entry in entries[i:i + MAX_BATCH_WRITES]:
+            ref = media_collection().document(entry["id"])
+            batch.set(ref, {**entry, "createdAt": firestore.SERVER_TIMESTAMP}, merge=True)
+        batch.commit()
+        job.count("migrated", len(entries[i:i + MAX_BATCH_WRITES]))
+        job.checkpoint()
+
+    db.collection(LEGACY_DOC[0]).document(LEGACY_DOC[1]).set(
+        {"files": [], "migratedAt": firestore.SERVER_TIMESTAMP}, merge=True
+    )
+    settings_store.note_write(*LEGACY_DOC, {"files": []})
+    return {"migrated": len(entries)}
+
+
+register_job("media_migration", migrate_legacy_media)
+
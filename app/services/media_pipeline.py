@@ -0,0 +1,163 @@
+import base64
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps, features
+
+from app.services.firebase_setup import bucket
+
+# Uploaded images are read once (with a size cap), then resized into WebP and,
+# when Pillow has AVIF support, AVIF variants at several widths plus a tiny
+# blurred placeholder. Objects are stored under the content hash, so all of
+# them can be served with a year-long immutable Cache-Control.
+MAX_UPLOAD_BYTES = int(os.getenv("MEDIA_MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+READ_CHUNK_BYTES = 1024 * 1024
+VARIANT_WIDTHS = (320, 640, 960, 1280, 1920)
+PLACEHOLDER_WIDTH = 16
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+VARIANT_FORMATS = {"webp": {"format": "WEBP", "quality": 80, "method": 6}}
+if features.check("avif"):
+    VARIANT_FORMATS["avif"] = {"format": "AVIF", "quality": 55}
+
+_image_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 2, thread_name_prefix="media-resize")
+_upload_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="media-upload")
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def read_upload(stream, limit: int = MAX_UPLOAD_BYTES):
+    """
+    Read an upload in chunks, refusing it as soon as it passes the cap.
+    Returns (bytes, sha256 hex digest) hashed in the same pass.
+    """
+    buffer = io.BytesIO()
+    digest = hashlib.sha256()
+    while True:
+        chunk = stream.read(READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        if buffer.tell() + len(chunk) > limit:
+            raise UploadTooLarge(f"Upload exceeds the {limit // (1024 * 1024)} MB limit")
+        buffer.write(chunk)
+        digest.update(chunk)
+    return buffer.getvalue(), digest.hexdigest()
+
+
+# -----------------------------
+# IMAGE PROCESSING
+# -----------------------------
+def _open_image(data: bytes):
+    image = Image.open(io.BytesIO(data))
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    return image.convert("RGBA" if has_alpha else "RGB")
+
+
+def _resize(image, width: int):
+    if width >= image.width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def _encode(image, width: int, fmt: str) -> bytes:
+    options = dict(VARIANT_FORMATS[fmt])
+    out = io.BytesIO()
+    _resize(image, width).save(out, options.pop("format"), **options)
+    return out.getvalue()
+
+
+def _placeholder(image) -> str:
+    """A tiny WebP as a data URI; browsers upscale it as a blur-up preview."""
+    out = io.BytesIO()
+    _resize(image, PLACEHOLDER_WIDTH).save(out, "WEBP", quality=40)
+    return "data:image/webp;base64," + base64.b64encode(out.getvalue()).decode("ascii")
+
+
+def variant_widths(original_width: int) -> list:
+    widths = [w for w in VARIANT_WIDTHS if w < original_width]
+    # Always keep one variant at (capped) full size.
+    widths.append(min(original_width, VARIANT_WIDTHS[-1]))
+    return sorted(set(widths))
+
+
+def build_variants(data: bytes):
+    """Return (width, height, placeholder, [(width, fmt, bytes)]) using the worker pool."""
+    image = _open_image(data)
+    widths = variant_widths(image.width)
+    jobs = [
+        (width, fmt, _image_pool.submit(_encode, image, width, fmt))
+        for width in widths
+        for fmt in VARIANT_FORMATS
+    ]
+    placeholder = _image_pool.submit(_placeholder, image)
+    variants = [(width, fmt, future.result()) for width, fmt, future in jobs]
+    return image.width, image.height, placeholder.result(), variants
+
+
+# -----------------------------
+# STORAGE
+# -----------------------------
+def _upload_blob(path: str, data: bytes, content_type: str) -> str:
+    blob = bucket.blob(path)
+    blob.cache_control = IMMUTABLE_CACHE_CONTROL
+    blob.upload_from_string(data, content_type=content_type)
+    blob.make_public()
+    return blob.public_url
+
+
+def srcset(variants: list, fmt: str) -> str:
+    return ", ".join(f"{v['url']} {v['width']}w" for v in variants if v["format"] == fmt)
+
+
+def process_upload(data: bytes, content_hash: str, filename: str, content_type: str) -> dict:
+    """Store the original and, for images, its responsive variants; return the media entry."""
+    file_id = content_hash
+    base_path = f"media/{file_id}"
+
+    try:
+        width, height, placeholder, encoded = build_variants(data)
+    except (Image.UnidentifiedImageError, OSError):
+        # Not an image Pillow can read (video, PDF, ...): store it as-is.
+        encoded, width, height, placeholder = [], None, None, None
+
+    uploads = [(f"{base_path}-{filename}", data, content_type or "application/octet-stream")]
+    uploads += [
+        (f"{base_path}/{w}.{fmt}", body, f"image/{fmt}")
+        for w, fmt, body in encoded
+    ]
+    urls = list(_upload_pool.map(lambda args: _upload_blob(*args), uploads))
+
+    entry = {
+        "id": file_id,
+        "hash": content_hash,
+        "name": filename,
+        "url": urls[0],
+        "contentType": content_type,
+        "size": len(data),
+    }
+    if encoded:
+        variants = [
+            {"width": w, "format": fmt, "url": url, "size": len(body)}
+            for (w, fmt, body), url in zip(encoded, urls[1:])
+        ]
+        entry.update({
+            "width": width,
+            "height": height,
+            "placeholder": placeholder,
+            "variants": variants,
+            "srcset": {fmt: srcset(variants, fmt) for fmt in VARIANT_FORMATS},
+        })
+    return entry
+
+
+def media_blob_paths(entry: dict) -> list:
+    """Every storage path written for a media entry."""
+    paths = [f"media/{entry['id']}-{entry['name']}"]
+    paths += [f"media/{entry['id']}/{v['width']}.{v['format']}" for v in entry.get("variants") or []]
+    return paths
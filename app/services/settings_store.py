@@ -0,0 +1,187 @@
+import threading
+
+from app.services.firebase_setup import db
+
+# Every settings/* and siteSettings/* document lives in memory as an
+# immutable snapshot kept current by on_snapshot listeners, so reads never
+# touch Firestore. Defaults are merged in memory and never written back.
+SETTINGS_COLLECTIONS = ("settings", "siteSettings")
+INITIAL_LOAD_TIMEOUT_SECONDS = 15
+
+
+class FrozenDict(dict):
+    """A dict that refuses mutation; still serializes like a plain dict."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Settings snapshots are read-only; use settings_store.get_copy()")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return FrozenDict({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+def merge_defaults(data: dict, defaults: dict) -> dict:
+    """Fill keys missing from data with defaults, recursing into nested dicts."""
+    merged = dict(data)
+    for key, default in defaults.items():
+        current = merged.get(key)
+        if key not in merged:
+            merged[key] = default
+        elif isinstance(default, dict):
+            # A corrupted nested section (e.g. pricing items) falls back to defaults.
+            merged[key] = merge_defaults(current, default) if isinstance(current, dict) else default
+    return merged
+
+
+def merge_write(current: dict, data: dict) -> dict:
+    """Apply data to current the way Firestore set(merge=True) does: nested maps merge."""
+    merged = dict(current)
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_write(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+class SettingsStore:
+    def __init__(self):
+        self._raw = {}        # (collection, doc id) -> Firestore data
+        self._snapshots = {}  # (collection, doc id) -> frozen data with defaults
+        self._defaults = {}
+        self._lock = threading.Lock()
+        self._watches = []
+        self._subscribers = []
+        self._loaded = {name: threading.Event() for name in SETTINGS_COLLECTIONS}
+        self.version = 0
+
+    # -----------------------------
+    # CHANGE SUBSCRIBERS
+    # -----------------------------
+    def subscribe(self, callback):
+        """Call callback() after every change; used to rebuild derived caches."""
+        self._subscribers.append(callback)
+
+    def _notify(self):
+        self.version += 1
+        for callback in self._subscribers:
+            try:
+                callback()
+            except Exception as exc:
+                print(f"SETTINGS STORE subscriber failed: {exc}")
+
+    # -----------------------------
+    # DEFAULTS
+    # -----------------------------
+    def register_defaults(self, collection: str, doc_id: str, defaults: dict):
+        key = (collection, doc_id)
+        with self._lock:
+            self._defaults[key] = defaults
+            self._rebuild(key)
+        self._notify()
+
+    def _rebuild(self, key):
+        raw = self._raw.get(key)
+        defaults = self._defaults.get(key)
+        if raw is None and defaults is None:
+            self._snapshots.pop(key, None)
+            return
+        data = merge_defaults(raw or {}, defaults or {})
+        self._snapshots[key] = freeze(data)
+
+    # -----------------------------
+    # LISTENERS
+    # -----------------------------
+    def _listener(self, collection: str):
+        def on_change(col_snapshot, changes, read_time):
+            with self._lock:
+                for change in changes:
+                    key = (collection, change.document.id)
+                    if change.type.name == "REMOVED":
+                        self._raw.pop(key, None)
+                    else:
+                        self._raw[key] = change.document.to_dict() or {}
+                    self._rebuild(key)
+            self._loaded[collection].set()
+            self._notify()
+        return on_change
+
+    def start(self):
+        """Attach listeners and wait for the first snapshot of each collection."""
+        if self._watches:
+            return
+        for collection in SETTINGS_COLLECTIONS:
+            self._watches.append(db.collection(collection).on_snapshot(self._listener(collection)))
+        for collection, loaded in self._loaded.items():
+            if not loaded.wait(INITIAL_LOAD_TIMEOUT_SECONDS):
+                print(f"SETTINGS STORE: initial load of {collection} timed out")
+
+    @property
+    def is_live(self) -> bool:
+        return bool(self._watches)
+
+    def stop(self):
+        for watch in self._watches:
+            watch.unsubscribe()
+        self._watches = []
+
+    def _ensure_loaded(self, collection: str):
+        # Outside the app (scripts, one-off tasks) there are no listeners;
+        # fall back to a single read of the collection.
+        if self._watches or self._loaded[collection].is_set():
+            return
+        docs = list(db.collection(collection).stream())
+        with self._lock:
+            for doc in docs:
+                key = (collection, doc.id)
+                self._raw[key] = doc.to_dict() or {}
+                self._rebuild(key)
+        self._loaded[collection].set()
+        self._notify()
+
+    # -----------------------------
+    # READS / WRITES
+    # -----------------------------
+    def get(self, collection: str, doc_id: str):
+        """Read-only snapshot with defaults applied, or None if absent with no defaults."""
+        self._ensure_loaded(collection)
+        return self._snapshots.get((collection, doc_id))
+
+    def get_copy(self, collection: str, doc_id: str) -> dict:
+        snapshot = self.get(collection, doc_id)
+        return thaw(snapshot) if snapshot is not None else {}
+
+    def note_write(self, collection: str, doc_id: str, data: dict, merge: bool = True):
+        """
+        Apply a write the caller just made so the next read sees it without
+        waiting for the listener, which confirms it shortly after.
+        """
+        key = (collection, doc_id)
+        with self._lock:
+            current = (self._raw.get(key) or {}) if merge else {}
+            self._raw[key] = merge_write(current, data)
+            self._rebuild(key)
+        self._notify()
+
+
+settings_store = SettingsStore()
@@ -0,0 +1,101 @@
+import gzip
+import hashlib
+import json
+import threading
+
+from app.services.settings_store import settings_store
+
+try:
+    import brotli
+except ImportError:  # optional; gzip and identity are always served
+    brotli = None
+
+# Everything the public site needs in one document. The JSON body and its
+# gzip/brotli encodings are built once per settings change, so a request is
+# a dictionary lookup and a byte write.
+CACHE_CONTROL = "public, max-age=60, s-maxage=300, stale-while-revalidate=600"
+
+_lock = threading.Lock()
+_built_version = -1  # settings_store.version the current bodies were built from
+_bodies = {}  # encoding -> (etag, bytes); replaced wholesale on rebuild
+
+
+def build_document() -> dict:
+    promotions = settings_store.get("siteSettings", "promotions") or {}
+    return {
+        "theme": settings_store.get("settings", "theme") or {},
+        "homepage": settings_store.get("settings", "homepage") or {},
+        "businessInfo": settings_store.get("settings", "business_info") or {},
+        "promotions": {
+            "enabled": promotions.get("enabled", False),
+            "message": promotions.get("message", ""),
+        },
+        "pricing": settings_store.get("settings", "pricing") or {},
+    }
+
+
+def _is_current() -> bool:
+    return bool(_bodies) and _built_version == settings_store.version
+
+
+def rebuild():
+    """
+    Build under the lock and tag the bodies with the settings version they
+    were read at, so a slow build can never overwrite a newer one and a
+    change that lands mid-build is picked up by the next request.
+    """
+    global _bodies, _built_version
+    with _lock:
+        if _is_current():
+            return
+        version = settings_store.version
+        raw = json.dumps(build_document(), separators=(",", ":"), sort_keys=True, default=str).encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()[:32]
+
+        bodies = {
+            "identity": (f'"{digest}"', raw),
+            "gzip": (f'"{digest}-gz"', gzip.compress(raw, compresslevel=9, mtime=0)),
+        }
+        if brotli is not None:
+            bodies["br"] = (f'"{digest}-br"', brotli.compress(raw, quality=11))
+
+        _bodies = bodies
+        _built_version = version
+
+
+def _on_settings_change():
+    # With live listeners the new body is ready before the next request.
+    if settings_store.is_live:
+        rebuild()
+
+
+settings_store.subscribe(_on_settings_change)
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if quality > 0:
+            accepted.add(name.strip().lower())
+
+    if "br" in accepted and brotli is not None:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def get_body(encoding: str):
+    """Return (etag, bytes) for an encoding, rebuilding only after a change."""
+    if not _is_current():
+        rebuild()
+    bodies = _bodies
+    return bodies.get(encoding) or bodies["identity"]
@@ -0,0 +1,165 @@
+import os
+import random
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import defaultdict
+
+import stripe
+
+from app.services.rate_limit import TokenBucket
+
+# Every Stripe API call goes through call(): one shared HTTP session, one
+# token bucket for all callers, jittered retries for retryable failures and
+# per-endpoint latency/error metrics.
+stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+
+STRIPE_RATE_PER_SECOND = float(os.getenv("STRIPE_RATE_PER_SECOND", "20"))
+STRIPE_BURST = int(os.getenv("STRIPE_BURST", "20"))
+STRIPE_MAX_ATTEMPTS = int(os.getenv("STRIPE_MAX_ATTEMPTS", "4"))
+STRIPE_BACKOFF_BASE = 0.5
+STRIPE_BACKOFF_CAP = 8.0
+STRIPE_TIMEOUT_SECONDS = 30
+
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+MUTATING_METHODS = {"create", "pay", "send_invoice", "finalize_invoice", "void_invoice", "modify", "confirm"}
+
+
+def _stripe_error(name: str):
+    return getattr(stripe, name, None) or getattr(stripe.error, name)
+
+
+RateLimitError = _stripe_error("RateLimitError")
+APIConnectionError = _stripe_error("APIConnectionError")
+APIError = _stripe_error("APIError")
+StripeError = _stripe_error("StripeError")
+
+
+def _configure_http_client():
+    """Reuse one pooled requests session for every call instead of the default per-call setup."""
+    try:
+        stripe.default_http_client = stripe.http_client.RequestsClient(timeout=STRIPE_TIMEOUT_SECONDS)
+    except AttributeError:
+        pass
+
+
+_configure_http_client()
+
+
+# -----------------------------
+# SHARED TOKEN BUCKET
+# -----------------------------
+_bucket = TokenBucket(STRIPE_RATE_PER_SECOND, STRIPE_BURST)
+
+
+# -----------------------------
+# METRICS
+# -----------------------------
+_metrics_lock = threading.Lock()
+_metrics = defaultdict(lambda: {
+    "calls": 0,
+    "retries": 0,
+    "errors": defaultdict(int),
+    "latency_ms_buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+    "latency_ms_total": 0.0,
+})
+
+
+def _observe(endpoint: str, elapsed_ms: float, error: Exception = None, retried: bool = False):
+    with _metrics_lock:
+        entry = _metrics[endpoint]
+        if retried:
+            entry["retries"] += 1
+            return
+        entry["calls"] += 1
+        entry["latency_ms_total"] += elapsed_ms
+        entry["latency_ms_buckets"][bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        if error is not None:
+            entry["errors"][type(error).__name__] += 1
+
+
+def get_metrics() -> dict:
+    labels = [f"le_{b}" for b in LATENCY_BUCKETS_MS] + ["gt_%d" % LATENCY_BUCKETS_MS[-1]]
+    with _metrics_lock:
+        return {
+            endpoint: {
+                "calls": entry["calls"],
+                "retries": entry["retries"],
+                "errors": dict(entry["errors"]),
+                "avg_latency_ms": round(entry["latency_ms_total"] / entry["calls"], 1) if entry["calls"] else 0,
+                "latency_ms": dict(zip(labels, entry["latency_ms_buckets"])),
+            }
+            for endpoint, entry in _metrics.items()
+        }
+
+
+# -----------------------------
+# RETRIES
+# -----------------------------
+def _is_retryable(exc: Exception) -> bool:
+    headers = getattr(exc, "headers", None) or {}
+    should_retry = headers.get("stripe-should-retry") if hasattr(headers, "get") else None
+    if should_retry is not None:
+        return str(should_retry).lower() == "true"
+    if isinstance(exc, (RateLimitError, APIConnectionError)):
+        return True
+    if getattr(exc, "code", None) == "lock_timeout":
+        return True
+    status = getattr(exc, "http_status", None)
+    return isinstance(exc, APIError) and (status is None or status >= 500)
+
+
+def _backoff(attempt: int) -> float:
+    # Full jitter keeps concurrent callers from retrying in lockstep.
+    return random.uniform(0, min(STRIPE_BACKOFF_CAP, STRIPE_BACKOFF_BASE * (2 ** attempt)))
+
+
+def _resolve(endpoint: str):
+    target = stripe
+    for part in endpoint.split("."):
+        target = getattr(target, part)
+    return target
+
+
+def call(endpoint: str, *args, **kwargs):
+    """
+    Call a Stripe API method by name, e.g. call("Invoice.retrieve", invoice_id).
+    Mutating calls get an idempotency key when the caller has none, so a
+    retried request can never be applied twice.
+    """
+    method = _resolve(endpoint)
+    if endpoint.rsplit(".", 1)[-1] in MUTATING_METHODS and "idempotency_key" not in kwargs:
+        kwargs["idempotency_key"] = f"gateway-{uuid.uuid4()}"
+
+    attempt = 0
+    while True:
+        _bucket.acquire()
+        started = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        except StripeError as exc:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if attempt + 1 < STRIPE_MAX_ATTEMPTS and _is_retryable(exc):
+                _observe(endpoint, elapsed_ms, retried=True)
+                time.sleep(_backoff(attempt))
+                attempt += 1
+                continue
+            _observe(endpoint, elapsed_ms, error=exc)
+            raise
+        _observe(endpoint, (time.perf_counter() - started) * 1000)
+        return result
+
+
+def list_all(endpoint: str, **params):
+    """Iterate every object of a list endpoint, one gateway call per page."""
+    params.setdefault("limit", 100)
+    while True:
+        page = call(endpoint, **params)
+        data = page.get("data") or []
+        for obj in data:
+            yield obj
+        if not page.get("has_more") or not data:
+            return
+        params["starting_after"] = data[-1].get("id")
@@ -1,14 +1,16 @@
-import os
 from datetime import datetime, timedelta, timezone
 
-import stripe
 from google.cloud import firestore
 
+from app.services import stripe_gateway
 from app.services.firebase_setup import db
+from app.services.invoice_state import get_fresh_invoice_state, remember_invoice_state, state_fields
 
 
 DEPOSIT_AMOUNT = 75.00
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+# Invoice states the recovery job queries for. "pending" is written when the
+# deposit lands so a missing invoice is visible to an indexed query.
+RECOVERABLE_INVOICE_STATUSES = ["pending", "failed", "draft"]
 
 
 def authoritative_remaining_balance(booking: dict) -> float:
@@ -64,9 +66,27 @@ def ensure_remaining_invoice(booking: dict, doc_ref=None) -> dict:
     invoice_id = booking.get("stripe_remaining_invoice_id")
 
     if invoice_id:
-        invoice = stripe.Invoice.retrieve(invoice_id)
+        # Webhooks keep the cached state current; only ask Stripe when the
+        # state is unknown, stale, or still needs action (draft).
+        cached_status = get_fresh_invoice_state(invoice_id, booking)
+        if cached_status == "paid":
+            doc_ref.update({
+                "paymentStatus": "balance_paid",
+                "remainingBalance": 0,
+            })
+            return {"status": "paid", "invoice_id": invoice_id, "amount": remaining}
+        if cached_status == "open":
+            return {
+                "status": "open",
+                "invoice_id": invoice_id,
+                "hosted_invoice_url": booking.get("stripe_hosted_invoice_url"),
+                "amount": remaining,
+            }
+        invoice = stripe_gateway.call("Invoice.retrieve", invoice_id)
+        remember_invoice_state(invoice.id, invoice.status)
     else:
-        stripe.InvoiceItem.create(
+        stripe_gateway.call(
+            "InvoiceItem.create",
             customer=customer_id,
             amount=int(round(remaining * 100)),
             currency="usd",
@@ -74,7 +94,8 @@ def ensure_remaining_invoice(booking: dict, doc_ref=None) -> dict:
             metadata={"booking_id": booking_id, "payment_type": "remaining_balance"},
             idempotency_key=f"booking-{booking_id}-remaining-item",
         )
-        invoice = stripe.Invoice.create(
+        invoice = stripe_gateway.call(
+            "Invoice.create",
             customer=customer_id,
             collection_method="send_invoice",
             due_date=invoice_due_timestamp(event_date),
@@ -84,11 +105,12 @@ def ensure_remaining_invoice(booking: dict, doc_ref=None) -> dict:
             idempotency_key=f"booking-{booking_id}-remaining-invoice",
         )
         invoice_id = invoice.id
+        remember_invoice_state(invoice.id, invoice.status)
         doc_ref.update({
             "remaining": remaining,
             "stripe_remaining_invoice_id": invoice_id,
             "stripe_invoice_amount": remaining,
-            "stripe_invoice_status": invoice.status,
+            **state_fields(invoice.status),
             "stripe_invoice_created_at": firestore.SERVER_TIMESTAMP,
             "stripe_invoice_error": firestore.DELETE_FIELD,
         })
@@ -96,23 +118,25 @@ def ensure_remaining_invoice(booking: dict, doc_ref=None) -> dict:
     if invoice.status == "paid":
         doc_ref.update({
             "paymentStatus": "balance_paid",
-            "stripe_invoice_status": "paid",
+            **state_fields("paid"),
             "remainingBalance": 0,
         })
         return {"status": "paid", "invoice_id": invoice.id, "amount": remaining}
 
     if invoice.status == "draft":
-        invoice = stripe.Invoice.send_invoice(
+        invoice = stripe_gateway.call(
+            "Invoice.send_invoice",
             invoice.id,
             idempotency_key=f"booking-{booking_id}-send-remaining-invoice",
         )
+        remember_invoice_state(invoice.id, invoice.status)
 
     doc_ref.update({
         "stripe_remaining_invoice_id": invoice.id,
         "stripe_hosted_invoice_url": invoice.hosted_invoice_url,
         "stripe_invoice_pdf": invoice.invoice_pdf,
         "stripe_invoice_amount": remaining,
-        "stripe_invoice_status": invoice.status,
+        **state_fields(invoice.status),
         "stripe_invoice_sent_at": firestore.SERVER_TIMESTAMP,
         "stripe_invoice_error": firestore.DELETE_FIELD,
     })
@@ -138,9 +162,11 @@ def update_booking_from_invoice(invoice, payment_status: str):
     if not booking_id:
         return None
 
+    status = invoice.get("status") or payment_status
+    remember_invoice_state(invoice.get("id"), status)
     updates = {
         "stripe_remaining_invoice_id": invoice.get("id"),
-        "stripe_invoice_status": invoice.get("status") or payment_status,
+        **state_fields(status),
         "stripe_invoice_updated_at": firestore.SERVER_TIMESTAMP,
     }
     if payment_status == "balance_paid":
@@ -0,0 +1,175 @@
+from google.cloud import firestore
+
+from app.services import stripe_gateway
+from app.services.firebase_setup import db
+from app.services.invoice_state import remember_invoice_state, state_fields
+from app.services.jobs import register_job
+
+# Watermark document: invoices created before "createdSince" were all in a
+# final state at the last run, so they can no longer drift.
+WATERMARK_REF = ("meta", "stripe_reconciliation")
+FINAL_INVOICE_STATUSES = {"paid", "void", "uncollectible"}
+MAX_BATCH_WRITES = 400
+MAX_REPORTED_DIFFS = 200
+
+
+def _watermark_ref():
+    return db.collection(WATERMARK_REF[0]).document(WATERMARK_REF[1])
+
+
+def get_watermark() -> int:
+    doc = _watermark_ref().get()
+    if not doc.exists:
+        return 0
+    return int((doc.to_dict() or {}).get("createdSince") or 0)
+
+
+def sweep_invoices(created_since: int) -> dict:
+    """Page through remaining-balance invoices once, keeping the newest per booking."""
+    invoices = {}
+    params = {}
+    if created_since:
+        params["created"] = {"gte": created_since}
+
+    for invoice in stripe_gateway.list_all("Invoice.list", **params):
+        metadata = invoice.get("metadata") or {}
+        if metadata.get("payment_type") != "remaining_balance":
+            continue
+        booking_id = metadata.get("booking_id")
+        if not booking_id:
+            continue
+        current = invoices.get(booking_id)
+        if current is None or invoice.get("created", 0) > current.get("created", 0):
+            invoices[booking_id] = invoice
+    return invoices
+
+
+def diff_booking(booking: dict, invoice) -> dict:
+    """Return the corrective updates for one booking, or {} when in sync."""
+    updates = {}
+    status = invoice.get("status")
+
+    if booking.get("stripe_remaining_invoice_id") != invoice.get("id"):
+        updates["stripe_remaining_invoice_id"] = invoice.get("id")
+    if booking.get("stripe_invoice_status") != status:
+        updates.update(state_fields(status))
+    if status == "paid" and booking.get("paymentStatus") != "balance_paid":
+        updates.update({
+            "paymentStatus": "balance_paid",
+            "remainingBalance": 0,
+        })
+    return updates
+
+
+def _next_watermark(invoices: dict, created_since: int) -> int:
+    open_created = [
+        inv.get("created", 0) for inv in invoices.values()
+        if inv.get("status") not in FINAL_INVOICE_STATUSES
+    ]
+    if open_created:
+        return min(open_created)
+    if invoices:
+        return max(inv.get("created", 0) for inv in invoices.values())
+    return created_since
+
+
+def run_reconciliation(job):
+    """
+    Join one Stripe invoice sweep against one projected bookings scan and
+    correct paymentStatus / stripe_invoice_status drift in batched writes.
+    """
+    created_since = job.params.get("createdSince")
+    if created_since is None:
+        created_since = get_watermark()
+
+    # Nothing is resumed from a cursor: a restarted job redoes the sweep and
+    # scan, so its counters start over instead of adding to the checkpoint.
+    job.progress = {}
+    invoices = sweep_invoices(created_since)
+    job.count("invoices", len(invoices))
+    job.checkpoint()
+
+    docs = (
+        db.collection("bookings")
+        .select(["paymentStatus", "stripe_invoice_status", "stripe_remaining_invoice_id"])
+        .stream()
+    )
+
+    dry_run = bool(job.params.get("dryRun"))
+    diffs = []
+    batch = db.batch()
+    pending_writes = 0
+    matched = 0
+
+    for doc in docs:
+        job.count("bookingsScanned")
+        invoice = invoices.get(doc.id)
+        if invoice is None:
+            continue
+        matched += 1
+        job.count("matched")
+        booking = doc.to_dict() or {}
+        remember_invoice_state(invoice.get("id"), invoice.get("status"))
+
+        updates = diff_booking(booking, invoice)
+        if booking.get("paymentStatus") == "balance_paid" and invoice.get("status") not in ("paid", None):
+            # Paid outside this invoice (e.g. manually); report, don't revert.
+            job.count("reportedOnly")
+            if len(diffs) < MAX_REPORTED_DIFFS:
+                diffs.append({
+                    "id": doc.id,
+                    "invoice_id": invoice.get("id"),
+                    "note": f"booking is balance_paid but invoice is {invoice.get('status')}",
+                })
+            updates.pop("paymentStatus", None)
+        if not updates:
+            continue
+
+        job.count("corrected")
+        if len(diffs) < MAX_REPORTED_DIFFS:
+            diffs.append({
+                "id": doc.id,
+                "invoice_id": invoice.get("id"),
+                "before": {
+                    "paymentStatus": booking.get("paymentStatus"),
+                    "stripe_invoice_status": booking.get("stripe_invoice_status"),
+                },
+                "after": {
+                    "paymentStatus": updates.get("paymentStatus", booking.get("paymentStatus")),
+                    "stripe_invoice_status": invoice.get("status"),
+                },
+            })
+        if dry_run:
+            continue
+
+        batch.update(doc.reference, {**updates, "stripe_reconciled_at": firestore.SERVER_TIMESTAMP})
+        pending_writes += 1
+        if pending_writes >= MAX_BATCH_WRITES:
+            batch.commit()
+            batch = db.batch()
+            pending_writes = 0
+            job.checkpoint()
+
+    if pending_writes:
+        batch.commit()
+
+    job.count("invoicesWithoutBooking", len(invoices) - matched)
+
+    next_watermark = _next_watermark(invoices, created_since)
+    if not dry_run:
+        _watermark_ref().set({
+            "createdSince": next_watermark,
+            "lastRunAt": firestore.SERVER_TIMESTAMP,
+            "lastJobId": job.id,
+        }, merge=True)
+
+    return {
+        "createdSince": created_since,
+        "nextWatermark": next_watermark,
+        "dryRun": dry_run,
+        "counts": dict(job.progress),
+        "diffs": diffs,
+    }
+
+
+register_job("stripe_reconciliation", run_reconciliation)
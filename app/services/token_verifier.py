@@ -0,0 +1,60 @@
+import hashlib
+import threading
+import time
+
+from firebase_admin import auth as firebase_auth
+
+from app.services.ttl_cache import TTLCache
+
+# Firebase ID tokens are verified once by firebase_admin and the decoded
+# claims are then served from memory until the token expires, keyed by a
+# hash of the token. Failed verifications are never cached.
+TOKEN_EXPIRY_MARGIN_SECONDS = 30
+
+_verified = TTLCache(max_size=1000, ttl_seconds=3600)
+_stats_lock = threading.Lock()
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "failures": 0,
+    "verify_ms_total": 0.0,
+}
+
+
+def _count(name: str, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def verify_id_token_cached(token: str) -> dict:
+    """Decoded claims for a Firebase ID token; raises like firebase_auth.verify_id_token."""
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    claims = _verified.get(key)
+    if claims is not None:
+        _count("hits")
+        return claims
+
+    _count("misses")
+    started = time.perf_counter()
+    try:
+        claims = firebase_auth.verify_id_token(token)
+    except Exception:
+        _count("failures")
+        raise
+    finally:
+        _count("verify_ms_total", (time.perf_counter() - started) * 1000)
+
+    ttl = claims.get("exp", 0) - time.time() - TOKEN_EXPIRY_MARGIN_SECONDS
+    if ttl > 0:
+        _verified.set(key, claims, ttl_seconds=ttl)
+    return claims
+
+
+def get_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0
+    stats["avg_verify_ms"] = round(stats.pop("verify_ms_total") / stats["misses"], 2) if stats["misses"] else 0
+    stats["cached_tokens"] = len(_verified)
+    return stats
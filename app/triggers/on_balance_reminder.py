@@ -1,36 +1,104 @@
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from app.firebase_config import db
+from google.cloud import firestore
+from app.services.firebase_setup import db
 from app.services.email_service import send_email_template
+from app.services.email_outbox import wake_outbox_worker
+
+REMINDER_CONCURRENCY = 8
+
+
+def _send_reminder(doc):
+    """Queue one reminder and record its outcome on the booking in one batch."""
+    started = time.perf_counter()
+    booking = doc.to_dict()
+    result = {"id": doc.id, "email": booking.get("email")}
+
+    batch = db.batch()
+    try:
+        pay_link = booking.get("stripe_hosted_invoice_url") or booking.get("invoice_url") or "https://www.buzzys.org/pay"
+        send_res = send_email_template(
+            to=booking["email"],
+            template_id=os.getenv("RESEND_BALANCE_DUE_REMINDER_TEMPLATE"),
+            data={
+                "name": booking["name"],
+                "remaining": f"${float(booking['remaining']):.2f}",
+                "pay_link": pay_link,
+                "date": booking["date"],
+                # Fills the template's other booking fields from `booking`, no re-read
+                "booking_id": doc.id,
+            },
+            booking=booking,
+            writer=batch,
+        )
+    except Exception as e:
+        send_res = {"status": "error", "message": str(e)}
+
+    if send_res.get("status") == "queued":
+        outcome = {
+            "balanceReminderSentAt": firestore.SERVER_TIMESTAMP,
+            "balanceReminderOutboxId": send_res.get("outbox_id"),
+            "balanceReminderStatus": "queued",
+            "balanceReminderError": firestore.DELETE_FIELD,
+        }
+    else:
+        # No marker: the next run tries this booking again.
+        outcome = {
+            "balanceReminderStatus": "error",
+            "balanceReminderError": str(send_res.get("message"))[:500],
+            "balanceReminderAttemptAt": firestore.SERVER_TIMESTAMP,
+        }
+
+    # The precondition fails if another run touched the booking first, so a
+    # concurrent cron hit can never queue a second reminder.
+    batch.update(doc.reference, outcome, option=db.write_option(last_update_time=doc.update_time))
+    try:
+        batch.commit()
+        result["status"] = outcome["balanceReminderStatus"]
+        if result["status"] == "error":
+            result["error"] = outcome["balanceReminderError"]
+    except Exception as e:
+        result["status"] = "skipped"
+        result["error"] = f"booking changed concurrently: {e}"
+
+    result["ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
 
 def process_upcoming_balances():
     # 1. Target date is 2 days from now
     target_date = (datetime.utcnow() + timedelta(days=2)).strftime("%Y-%m-%d")
-    
+
     # 2. Find active bookings with only a deposit paid for that date
     docs = (
         db.collection("bookings")
         .where("date", "==", target_date)
         .where("status", "==", "active")
-        .where("paymentStatus", "==", "deposit_paid") 
+        .where("paymentStatus", "==", "deposit_paid")
         .stream()
     )
 
-    sent_list = []
+    # 3. Skip anything a previous run already reminded
+    pending = []
+    already_sent = 0
     for doc in docs:
-        booking = doc.to_dict()
-        pay_link = booking.get("invoice_url") or "https://www.buzzys.org/pay"
-        
-        send_email_template(
-            to=booking["email"],
-            template_id=os.getenv("RESEND_BALANCE_DUE_REMINDER_TEMPLATE"),
-            data={
-                "name": booking["name"],
-                "remaining": f"${float(booking['remaining']):.2f}",
-                "pay_link": pay_link,
-                "date": booking["date"]
-            }
-        )
-        sent_list.append(doc.id)
+        if (doc.to_dict() or {}).get("balanceReminderSentAt"):
+            already_sent += 1
+        else:
+            pending.append(doc)
+
+    # 4. Queue reminders concurrently
+    with ThreadPoolExecutor(max_workers=REMINDER_CONCURRENCY) as pool:
+        results = list(pool.map(_send_reminder, pending))
+
+    wake_outbox_worker()
 
-    return {"status": "success", "date_processed": target_date, "count": len(sent_list)}
\ No newline at end of file
+    return {
+        "status": "success",
+        "date_processed": target_date,
+        "count": sum(1 for r in results if r["status"] == "queued"),
+        "already_sent": already_sent,
+        "results": results,
+    }
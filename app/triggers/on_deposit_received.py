@@ -1,4 +1,5 @@
 from app.services.email_service import send_email_from_file, generate_ics_content
+from app.services.email_outbox import wake_outbox_worker
 from app.services.firebase_setup import db
 
 def handle_deposit_received(booking: dict):
@@ -38,20 +39,28 @@ def handle_deposit_received(booking: dict):
         "filename": "event-reminder.ics"
     }]
 
-    # --- 5. SEND EMAIL USING FILE TEMPLATE ---
+    # --- 5. QUEUE EMAIL USING FILE TEMPLATE ---
+    # The outbox sets last_email_id and emailStatus "Sent" once Resend accepts it.
+    booking_id = booking.get("booking_id")
+    batch = db.batch()
     email_res = send_email_from_file(
         to=[booking.get("email")],
         template_name="deposit_received.html",
         subject="Your Booking Is Confirmed!",
-        params=email_data
+        params=email_data,
+        booking_id=booking_id,
+        writer=batch,
     )
 
-    # --- 6. SAVE EMAIL ID FOR RESEND WEBHOOK ---
-    email_id = email_res.get("id")
-    if email_id:
-        db.collection("bookings").document(booking["booking_id"]).update({
-            "last_email_id": email_id,
-            "emailStatus": "Sent"
+    # --- 6. MARK THE BOOKING AS QUEUED (same batch, so it can't overwrite "Sent") ---
+    outbox_id = email_res.get("outbox_id")
+    if outbox_id and booking_id:
+        batch.update(db.collection("bookings").document(booking_id), {
+            "last_email_outbox_id": outbox_id,
+            "emailStatus": "Queued"
         })
+    if outbox_id:
+        batch.commit()
+        wake_outbox_worker()
 
     return email_res
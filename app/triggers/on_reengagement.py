@@ -31,7 +31,8 @@ def send_anniversary_reminders():
                 data={
                     "name": booking["name"],
                     "fun_message": "Got another event you'd like to be the 'bee's knees'? We've got you covered!"
-                }
+                },
+                booking=booking,
             )
             sent_count += 1
 
@@ -0,0 +1,56 @@
+"""
+Render benchmark for the email templates.
+
+Compares the old per-param str.replace loop against the precompiled
+segment renderer over every template in app/email_templates.
+
+    python -m benchmarks.email_render [iterations]
+"""
+import os
+import sys
+import timeit
+
+from app.services.email_templates import TEMPLATE_DIR, load_templates, render_template
+
+PARAMS = {
+    "name": "Jane <Doe>",
+    "customer_name": "Jane Doe",
+    "date": "2026-06-14",
+    "event_date": "2026-06-14",
+    "deliveryTime": "9:00 AM",
+    "pickupTime": "6:00 PM",
+    "address": "12 Main St, Rome, GA 30161",
+    "items": "Volcano 19ft Slide, Snow Cone Machine",
+    "total": "$512.40",
+    "total_amount": "512.40",
+    "deposit": "75.00",
+    "deposit_amount": "75.00",
+    "remaining": "437.40",
+    "remaining_amount": "437.40",
+    "booking_id": "3f2c9c1e-1111-4a4a-9b9b-123456789abc",
+    "pay_link": "https://www.buzzys.org/pay",
+    # Callers often pass whole booking records, so include unused keys too.
+    **{f"unused_{i}": i for i in range(30)},
+}
+
+
+def render_replace(name: str, params: dict) -> str:
+    with open(os.path.join(TEMPLATE_DIR, name), "r") as f:
+        html = f.read()
+    for key, value in params.items():
+        html = html.replace(f"{{{{{key}}}}}", str(value))
+    return html
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    names = load_templates()
+    print(f"{'template':32} {'replace (us)':>14} {'compiled (us)':>14} {'speedup':>8}")
+    for name in names:
+        old = timeit.timeit(lambda: render_replace(name, PARAMS), number=iterations) / iterations * 1e6
+        new = timeit.timeit(lambda: render_template(name, PARAMS), number=iterations) / iterations * 1e6
+        print(f"{name:32} {old:14.1f} {new:14.1f} {old / new:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()